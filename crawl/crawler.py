@@ -1,58 +1,67 @@
 """
 부경대 식단 게시판 크롤러 (Playwright)
+
+sources.py에 등록된 게시판/식당 테이블을 하나의 브라우저에서 동시에 크롤링한다.
+(source마다 페이지를 하나씩 열고 asyncio로 병렬 실행)
 """
-from datetime import datetime
-from playwright.sync_api import sync_playwright, Page
+import asyncio
+from typing import Optional
+from playwright.async_api import async_playwright, Browser, Page
 from urllib.parse import urljoin
 
+from sources import SOURCES, get_source
+
 
-LIST_URL = "https://www.pknu.ac.kr/main/399"
+LIST_URL = get_source('lilac')['list_url']
 
 
-def get_latest_post_info(page: Page) -> tuple[str, str]:
+async def get_latest_post_info(page: Page) -> tuple[str, str]:
     """
     목록 페이지에서 최신 게시물 번호와 날짜 추출
     Returns: (post_no, post_date)  예: ("211", "2025.01.13")
     """
-    post_no = page.locator("td.bdlNum").first.inner_text()
-    post_date = page.locator("td.bdlDate").first.inner_text()
+    post_no = await page.locator("td.bdlNum").first.inner_text()
+    post_date = await page.locator("td.bdlDate").first.inner_text()
     return post_no, post_date
 
 
-def go_to_detail_page(page: Page):
+async def go_to_detail_page(page: Page, list_url: str = LIST_URL):
     """상세 페이지로 이동"""
-    page.wait_for_selector("td.bdlTitle a")
+    await page.wait_for_selector("td.bdlTitle a")
     target_link = page.locator("td.bdlTitle a").first
-    href = target_link.get_attribute("href")
-    page.goto(urljoin(LIST_URL, href), wait_until="domcontentloaded", timeout=45000)
-    page.wait_for_timeout(1000)
+    href = await target_link.get_attribute("href")
+    await page.goto(urljoin(list_url, href), wait_until="domcontentloaded", timeout=45000)
+    await page.wait_for_timeout(1000)
 
 
-def find_table(page: Page, index: int, name: str):
+async def find_table(page: Page, index: int, name: str):
     """n번째 테이블 찾기"""
     tables = page.locator("table")
-    print(f"총 테이블 개수: {tables.count()}")
+    print(f"총 테이블 개수: {await tables.count()}")
 
     target = tables.nth(index)
-    target.scroll_into_view_if_needed()
-    page.wait_for_timeout(200)
+    await target.scroll_into_view_if_needed()
+    await page.wait_for_timeout(200)
     print(f'{name} 테이블 찾음')
 
     return target
 
 
-def extract_table_data(table) -> dict:
+async def extract_table_data(table) -> dict:
     """테이블에서 요일, 날짜, 메뉴 추출"""
-    rows = table.locator("tr").all()
+    rows = await table.locator("tr").all()
+
+    async def row_texts(row) -> list[str]:
+        return [(await cell.inner_text()).strip() for cell in await row.locator("th, td").all()]
 
     # Row 0: 요일 (구분, Monday, Tuesday, ...)
-    headers = [cell.inner_text().strip() for cell in rows[0].locator("th, td").all()]
+    headers = await row_texts(rows[0])
 
     # Row 1: 날짜 (11월 10일, 11월 11일, ...)
-    dates = [cell.inner_text().strip() for cell in rows[1].locator("th, td").all()]
+    dates = await row_texts(rows[1])
 
     # Row 2: 메뉴 (중식 가격 정보, 메뉴1, 메뉴2, ...)
-    menus = [cell.inner_text().strip() for cell in rows[2].locator("th, td").all()]
+    menus = await row_texts(rows[2])
 
     return {
         'headers': headers,
@@ -94,56 +103,163 @@ def format_daily_menus(raw_data: dict, cafeteria_name: str, post_number: str) ->
     return daily_data
 
 
-def crawl_menus(headless: bool = True) -> tuple[list[dict], str, str]:
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
+)
+
+
+async def new_page(browser: Browser) -> Page:
+    """크롤링용 브라우저 컨텍스트와 페이지 생성"""
+    ctx = await browser.new_context(
+        locale="ko-KR",
+        user_agent=USER_AGENT,
+        viewport={"width": 1280, "height": 1200}
+    )
+    return await ctx.new_page()
+
+
+async def probe_latest_post(page: Page, list_url: str = LIST_URL) -> tuple[str, str]:
     """
-    메뉴 크롤링 실행
+    목록 페이지에 진입하여 최신 게시물 번호와 날짜만 확인
+
+    Returns: (post_no, post_date)
+    """
+    await page.goto(list_url, wait_until="domcontentloaded", timeout=45000)
+    return await get_latest_post_info(page)
+
+
+async def crawl_page(page: Page, source: dict) -> tuple[list[dict], str, str]:
+    """
+    주어진 페이지로 목록 → 상세 페이지를 순회하며 source의 식당 테이블 전부 추출
 
     Returns: (menus_data, post_no, post_date)
-        - menus_data: [{'cafeteria': '라일락', 'date': '11월 10일', 'meals': '...', 'post_number': '211'}, ...]
-        - post_no: 게시물 번호 (예: "211")
-        - post_date: 게시물 날짜 (예: "2025.01.13")
     """
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless)
-        ctx = browser.new_context(
-            locale="ko-KR",
-            user_agent=(
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
-            ),
-            viewport={"width": 1280, "height": 1200}
-        )
-        page = ctx.new_page()
+    # 1) 목록 페이지 진입 + 최신 게시물 번호, 날짜 추출
+    post_no, post_date = await probe_latest_post(page, source['list_url'])
+    print(f"[{source['id']}] 게시물 번호: {post_no}, 날짜: {post_date}")
 
-        try:
-            # 1) 목록 페이지 진입
-            page.goto(LIST_URL, wait_until="domcontentloaded", timeout=45000)
+    # 2) 상세 페이지로 이동
+    await go_to_detail_page(page, source['list_url'])
 
-            # 2) 최신 게시물 번호, 날짜 추출
-            post_no, post_date = get_latest_post_info(page)
-            print(f"게시물 번호: {post_no}, 날짜: {post_date}")
+    # 3) 식당별 테이블 추출
+    menus_data = []
+    for table_spec in source['tables']:
+        cafeteria = table_spec['cafeteria']
+        print("\n" + "=" * 60)
+        print(f"{cafeteria} 식당 데이터 추출")
+        print("=" * 60)
 
-            # 3) 상세 페이지로 이동
-            go_to_detail_page(page)
+        table = await find_table(page, table_spec['index'], cafeteria)
+        raw = await extract_table_data(table)
+        daily = format_daily_menus(raw, cafeteria, post_no)
 
-            # 4) 라일락 테이블 추출
-            print("\n" + "=" * 60)
-            print("라일락 식당 데이터 추출")
-            print("=" * 60)
+        # 결과 출력
+        print(f"\n[{cafeteria} 크롤링 완료]")
+        for idx, item in enumerate(daily, 1):
+            print(f"{idx}. {item['date']}: {item['meals'][:50]}...")
 
-            lilac_table = find_table(page, 2, '라일락')
-            lilac_raw = extract_table_data(lilac_table)
-            lilac_daily = format_daily_menus(lilac_raw, '라일락', post_no)
+        menus_data.extend(daily)
 
-            # 결과 출력
-            print("\n[크롤링 완료]")
-            for idx, item in enumerate(lilac_daily, 1):
-                print(f"{idx}. {item['date']}: {item['meals'][:50]}...")
+    return menus_data, post_no, post_date
 
-            return lilac_daily, post_no, post_date
 
-        finally:
-            browser.close()
+class CrawlerSession:
+    """
+    하나의 브라우저를 띄워두고 여러 source를 동시에 probe/crawl하는 세션
+
+    - source마다 페이지(컨텍스트)를 하나씩 만들어 재사용
+    - 데몬에서는 세션을 계속 유지해서 매 반복마다 Chromium을 새로 띄우지 않음
+    - 브라우저가 죽으면 다음 호출 시 자동으로 다시 띄움
+    """
+
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self._playwright = None
+        self._browser: Optional[Browser] = None
+        self._pages: dict[str, Page] = {}
+        self._launch_lock = asyncio.Lock()
+
+    async def _ensure_page(self, source: dict) -> Page:
+        """브라우저/페이지가 살아있는지 확인하고 없으면 생성"""
+        async with self._launch_lock:
+            if self._browser is None or not self._browser.is_connected():
+                await self.close()
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+                print("🌐 브라우저 실행")
+            page = self._pages.get(source['id'])
+            if page is None or page.is_closed():
+                page = await new_page(self._browser)
+                self._pages[source['id']] = page
+            return page
+
+    async def probe(self, source: dict) -> tuple[str, str]:
+        """최신 게시물 번호와 날짜만 확인 (상세 페이지 미진입)"""
+        return await probe_latest_post(await self._ensure_page(source), source['list_url'])
+
+    async def crawl(self, source: dict) -> tuple[list[dict], str, str]:
+        """source 전체 크롤링 (menus_data, post_no, post_date)"""
+        return await crawl_page(await self._ensure_page(source), source)
+
+    async def probe_all(self, sources: list[dict] = SOURCES) -> dict[str, tuple[str, str] | Exception]:
+        """모든 source를 동시에 probe (실패한 source는 예외 객체로 반환)"""
+        results = await asyncio.gather(*(self.probe(source) for source in sources), return_exceptions=True)
+        return {source['id']: result for source, result in zip(sources, results)}
+
+    async def crawl_all(self, sources: list[dict] = SOURCES) -> dict[str, tuple[list[dict], str, str] | Exception]:
+        """여러 source를 동시에 크롤링 (실패한 source는 예외 객체로 반환)"""
+        results = await asyncio.gather(*(self.crawl(source) for source in sources), return_exceptions=True)
+        return {source['id']: result for source, result in zip(sources, results)}
+
+    async def reset(self, source_id: Optional[str] = None):
+        """페이지를 닫아 다음 호출 때 새 컨텍스트로 시작 (source_id 생략 시 전체)"""
+        source_ids = [source_id] if source_id else list(self._pages)
+        for sid in source_ids:
+            page = self._pages.pop(sid, None)
+            if page is not None:
+                try:
+                    await page.context.close()
+                except Exception:
+                    pass
+
+    async def close(self):
+        """브라우저와 Playwright 종료"""
+        await self.reset()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+def crawl_menus(headless: bool = True) -> tuple[list[dict], str, str]:
+    """
+    라일락 메뉴 크롤링 실행 (단일 source 동기 호출용)
+
+    Returns: (menus_data, post_no, post_date)
+        - menus_data: [{'cafeteria': '라일락', 'date': '11월 10일', 'meals': '...', 'post_number': '211'}, ...]
+        - post_no: 게시물 번호 (예: "211")
+        - post_date: 게시물 날짜 (예: "2025.01.13")
+    """
+    async def run():
+        async with CrawlerSession(headless=headless) as session:
+            return await session.crawl(get_source('lilac'))
+
+    return asyncio.run(run())
 
 
 def check_for_new_post(last_post_no: str, last_post_date: str, headless: bool = True) -> tuple[bool, str, str]:
@@ -152,24 +268,10 @@ def check_for_new_post(last_post_no: str, last_post_date: str, headless: bool =
 
     Returns: (is_new, current_post_no, current_post_date)
     """
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless)
-        ctx = browser.new_context(
-            locale="ko-KR",
-            user_agent=(
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
-            ),
-            viewport={"width": 1280, "height": 1200}
-        )
-        page = ctx.new_page()
-
-        try:
-            page.goto(LIST_URL, wait_until="domcontentloaded", timeout=45000)
-            current_no, current_date = get_latest_post_info(page)
-
-            is_new = (current_no != last_post_no) or (current_date != last_post_date)
-            return is_new, current_no, current_date
-
-        finally:
-            browser.close()
+    async def run():
+        async with CrawlerSession(headless=headless) as session:
+            return await session.probe(get_source('lilac'))
+
+    current_no, current_date = asyncio.run(run())
+    is_new = (current_no != last_post_no) or (current_date != last_post_date)
+    return is_new, current_no, current_date
@@ -0,0 +1,232 @@
+"""
+상주형 크롤러 데몬: 브라우저/HTTP 세션/Supabase 클라이언트를 유지한 채 주기적으로 크롤링
+
+GitHub Actions 크론 대신 자체 서버에서 실행하면 새 게시물 감지 지연을
+몇 시간 → 몇 분 단위로 줄일 수 있다.
+
+사용법:
+    python daemon.py [--no-headless] [--interval=300] [--health-file=daemon_health.json] [--adaptive]
+
+--adaptive: 고정 간격 대신 crawl_logs 이력으로 학습한 스케줄(scheduler.py)에 따라 polling
+"""
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from crawler import CrawlerSession
+from sources import SOURCES
+from supabase_client import get_client, get_last_state
+from main import effects, publish_menus
+from scheduler import AdaptiveSchedule, load_schedule
+from local_state import is_same_post
+
+
+DEFAULT_INTERVAL = 300          # 기본 polling 간격 (초)
+MAX_ERROR_BACKOFF = 3600        # 연속 실패 시 최대 대기 시간 (초)
+SCHEDULE_REFRESH = 24 * 3600    # 적응형 스케줄 재학습 주기 (초)
+DEFAULT_HEALTH_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "daemon_health.json")
+
+
+class CrawlerDaemon:
+    """probe → (필요 시) 전체 크롤링을 반복하는 상주 프로세스"""
+
+    def __init__(
+        self,
+        interval: int = DEFAULT_INTERVAL,
+        headless: bool = True,
+        health_file: str = DEFAULT_HEALTH_FILE,
+        adaptive: bool = False,
+    ):
+        self.interval = interval
+        self.adaptive = adaptive
+        self.schedule: AdaptiveSchedule | None = None
+        self._schedule_loaded_at: float | None = None
+        self.health_file = health_file
+        self.session = CrawlerSession(headless=headless)
+        # 브라우저가 반복 사이에도 살아있도록 이벤트 루프 하나를 계속 사용
+        self.loop = asyncio.new_event_loop()
+        self.client = None
+        self.last_states: dict[str, dict | None] = {}
+        self.consecutive_errors = 0
+        self._stop = threading.Event()
+
+    # ----------------------------------------
+    # 종료 처리
+    # ----------------------------------------
+
+    def stop(self, *_):
+        """종료 요청 (SIGTERM/SIGINT 핸들러)"""
+        if not self._stop.is_set():
+            print("\n🛑 종료 요청 수신 - 현재 작업 완료 후 종료합니다.")
+        self._stop.set()
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    # ----------------------------------------
+    # 헬스 파일
+    # ----------------------------------------
+
+    def write_health(self, status: str, message: str = ""):
+        """현재 상태를 헬스 파일에 기록 (외부 모니터링용 heartbeat)"""
+        health = {
+            "pid": os.getpid(),
+            "status": status,
+            "message": message,
+            "heartbeat_at": datetime.now().isoformat(),
+            "sources": {
+                sid: {"last_post_no": state['last_post_no'], "last_post_date": state['last_post_date']} if state else None
+                for sid, state in self.last_states.items()
+            },
+            "consecutive_errors": self.consecutive_errors,
+            "next_delay": self.next_delay(),
+        }
+        tmp_path = f"{self.health_file}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(health, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.health_file)
+        except OSError as e:
+            print(f"⚠️  헬스 파일 기록 실패: {e}")
+
+    # ----------------------------------------
+    # 크롤링 반복
+    # ----------------------------------------
+
+    def run_once(self) -> str:
+        """
+        1회 실행: 모든 source를 동시에 probe한 뒤 변경된 source만 동시에 크롤링
+
+        Returns: 'skipped' | 'success'
+        """
+        if self.client is None:
+            # 모든 source 상태를 읽은 뒤에만 반영 (중간에 실패하면 다음 반복에서 처음부터 다시 시도)
+            client = get_client()
+            last_states = {source['id']: get_last_state(client, source['state_id']) for source in SOURCES}
+            self.client, self.last_states = client, last_states
+
+        # 첫 반복에서는 무조건 학습 (monotonic()은 부팅 시점 기준이라 0과 비교하면 안 됨)
+        if self.adaptive and (self._schedule_loaded_at is None
+                              or time.monotonic() - self._schedule_loaded_at > SCHEDULE_REFRESH):
+            self.refresh_schedule()
+
+        errors = []
+        changed = []
+        probes = self.loop.run_until_complete(self.session.probe_all(SOURCES))
+        for source in SOURCES:
+            sid = source['id']
+            result = probes[sid]
+            if isinstance(result, Exception):
+                errors.append(f"[{sid}] 목록 페이지 확인 실패: {result}")
+                continue
+            # 스킵은 crawl_logs에 기록하지 않음 (heartbeat 파일로 대체)
+            if not is_same_post(self.last_states.get(sid), *result):
+                print(f"\n🆕 [{sid}] 새 게시물 감지: post_no={result[0]}, post_date={result[1]}")
+                changed.append(source)
+
+        results = self.loop.run_until_complete(self.session.crawl_all(changed)) if changed else {}
+        for source in changed:
+            sid = source['id']
+            result = results[sid]
+            if isinstance(result, Exception):
+                errors.append(f"[{sid}] 크롤링 실패: {result}")
+                self.loop.run_until_complete(self.session.reset(sid))
+                continue
+
+            menus_data, post_no, post_date = result
+            print(f"\n📥 [{sid}] 크롤링 완료: {len(menus_data)}개 메뉴")
+            try:
+                publish_menus(self.client, menus_data, post_no, post_date, source)
+                self.last_states[sid] = {"last_post_no": post_no, "last_post_date": post_date}
+            except Exception as e:
+                errors.append(f"[{sid}] 업로드 실패: {e}")
+
+        if errors:
+            raise RuntimeError("\n".join(errors))
+        return "success" if changed else "skipped"
+
+    def refresh_schedule(self):
+        """crawl_logs 이력으로 polling 스케줄 재학습"""
+        try:
+            self.schedule = load_schedule(self.client, dense_interval=min(self.interval, 120))
+            self._schedule_loaded_at = time.monotonic()
+            windows = ", ".join(f"{w['start']}~{w['end']}" for w in self.schedule.windows())
+            print(f"📅 polling 스케줄 갱신 (샘플 {self.schedule.sample_count}개): {windows}")
+        except Exception as e:
+            print(f"⚠️  polling 스케줄 갱신 실패 - 고정 간격 유지: {e}")
+
+    def next_delay(self) -> float:
+        """다음 실행까지 대기 시간 (연속 실패 시 지수 백오프)"""
+        if self.consecutive_errors:
+            return min(self.interval * (2 ** self.consecutive_errors), MAX_ERROR_BACKOFF)
+        if self.schedule is not None:
+            return self.schedule.next_delay()
+        return self.interval
+
+    def run(self):
+        """종료 요청이 올 때까지 반복 실행"""
+        print("=" * 60)
+        print(f"부경대 식단 크롤러 데몬 시작 (간격: {self.interval}초)")
+        print("=" * 60)
+
+        # 이전 실행에서 실패한 알림/로그 재시도
+        effects.replay_failed()
+
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                try:
+                    result = self.run_once()
+                    self.consecutive_errors = 0
+                    self.write_health("ok", result)
+                    effects.submit("healthcheck", status="success")
+                    if result == "success":
+                        print("✅ 새 식단 업로드 완료")
+                except Exception as e:
+                    self.consecutive_errors += 1
+                    print(f"❌ 크롤링 실패: {traceback.format_exc()}")
+                    self.write_health("error", str(e))
+                    effects.submit("log_crawl", status="error", message=str(e))
+                    effects.submit("discord_error", message=str(e))
+                    effects.submit("healthcheck", status="fail")
+                    # 페이지 상태가 꼬였을 수 있으므로 다음 반복은 새 컨텍스트로 시작
+                    self.loop.run_until_complete(self.session.reset())
+
+                # 이번 반복에서 예약한 알림/로그 마무리 (실패분은 파일에 기록)
+                effects.drain()
+
+                elapsed = time.monotonic() - started
+                self._stop.wait(max(0.0, self.next_delay() - elapsed))
+        finally:
+            self.loop.run_until_complete(self.session.close())
+            self.loop.close()
+            effects.shutdown()
+            self.write_health("stopped")
+            print("👋 데몬 종료")
+
+
+def _get_arg(name: str, default: str | None = None) -> str | None:
+    """--name=value 형식의 명령줄 인자 조회"""
+    prefix = f"--{name}="
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return default
+
+
+if __name__ == "__main__":
+    headless = "--no-headless" not in sys.argv
+    interval = int(_get_arg("interval", os.environ.get("CRAWL_INTERVAL", str(DEFAULT_INTERVAL))))
+    health_file = _get_arg("health-file", os.environ.get("HEALTH_FILE", DEFAULT_HEALTH_FILE))
+    adaptive = "--adaptive" in sys.argv
+
+    daemon = CrawlerDaemon(interval=interval, headless=headless, health_file=health_file, adaptive=adaptive)
+    daemon.install_signal_handlers()
+    daemon.run()
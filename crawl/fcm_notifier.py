@@ -9,6 +9,9 @@ import firebase_admin
 from firebase_admin import credentials, messaging
 
 
+FCM_HTTP_TIMEOUT = 10  # FCM 서버 요청 timeout (초, firebase_admin 기본값은 120초)
+
+
 class FCMNotifier:
     """FCM 푸시 알림 전송 클래스"""
     
@@ -28,7 +31,7 @@ class FCMNotifier:
                 if service_account_key_path and os.path.exists(service_account_key_path):
                     # 파일 경로에서 로드
                     cred = credentials.Certificate(service_account_key_path)
-                    firebase_admin.initialize_app(cred)
+                    firebase_admin.initialize_app(cred, {"httpTimeout": FCM_HTTP_TIMEOUT})
                     print(f"✅ Firebase Admin SDK 초기화 완료 (파일: {service_account_key_path})")
                 else:
                     # 환경변수에서 JSON 문자열 로드
@@ -39,7 +42,7 @@ class FCMNotifier:
                     # JSON 문자열을 딕셔너리로 파싱
                     service_account_info = json.loads(firebase_key_json)
                     cred = credentials.Certificate(service_account_info)
-                    firebase_admin.initialize_app(cred)
+                    firebase_admin.initialize_app(cred, {"httpTimeout": FCM_HTTP_TIMEOUT})
                     print("✅ Firebase Admin SDK 초기화 완료 (환경변수)")
                 
                 self.initialized = True
@@ -57,7 +60,8 @@ class FCMNotifier:
         topic: str,
         title: str,
         body: str,
-        data: Optional[Dict[str, str]] = None
+        data: Optional[Dict[str, str]] = None,
+        collapse_key: Optional[str] = None
     ) -> bool:
         """
         특정 토픽을 구독한 모든 기기에 알림 전송
@@ -67,6 +71,7 @@ class FCMNotifier:
             title: 알림 제목
             body: 알림 내용
             data: 추가 데이터 (선택)
+            collapse_key: 같은 키의 알림은 대기 중인 메시지/알림창에서 하나로 합쳐짐 (재전송 중복 방지)
         
         Returns:
             성공 여부
@@ -86,10 +91,12 @@ class FCMNotifier:
                 topic=topic,
                 android=messaging.AndroidConfig(
                     priority='high',
+                    collapse_key=collapse_key,
                     notification=messaging.AndroidNotification(
                         icon='ic_notification',
                         color='#7C4DFF',  # 라일락 색상
                         sound='default',
+                        tag=collapse_key,
                     ),
                 ),
             )
@@ -136,7 +143,8 @@ class FCMNotifier:
             topic="menu_updates",
             title=title,
             body=body,
-            data=data
+            data=data,
+            collapse_key=f"new_menu_{post_no}"
         )
 
 
@@ -0,0 +1,123 @@
+"""
+로컬 크롤링 상태 (crawl/state.json)
+
+- source별로 probe 결과를 먼저 로컬 상태와 비교해서, 변경이 없으면 DB를 전혀 호출하지 않음
+- 스킵 기록은 파일에 누적했다가 주기적으로 crawl_logs에 요약 1건만 기록
+- GitHub Actions에서는 actions/cache로 실행 간에 파일을 유지 (git에는 올리지 않음)
+- 이전 형식({'last_post_no', 'last_post_date'}) 파일도 읽을 수 있음 (캐시에 남아있는 경우)
+"""
+import json
+import os
+from datetime import datetime
+
+from utils import parse_post_date, format_date_for_db
+
+
+STATE_FILE = os.environ.get(
+    "CRAWL_STATE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "state.json")
+)
+
+SKIP_SUMMARY_INTERVAL = 24 * 3600   # 스킵 요약 로그 기록 주기 (초)
+
+
+def _read_state_file(path: str) -> dict:
+    """
+    상태 파일 전체 읽기: {'sources': {'lilac': {...}, ...}}
+
+    이전 형식({'last_post_no', 'last_post_date'})은 라일락 source 상태로 변환
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {"sources": {}}
+
+    if "sources" not in data:
+        legacy = {k: v for k, v in data.items() if k in ("last_post_no", "last_post_date", "pending_skips")}
+        data = {"sources": {"lilac": legacy} if legacy else {}}
+    return data
+
+
+def load_local_state(source_id: str = "lilac", path: str = STATE_FILE) -> dict | None:
+    """
+    source별 로컬 상태 읽기
+    Returns: {'last_post_no': '219', 'last_post_date': '2026-01-09', ...} or None
+    """
+    state = _read_state_file(path)["sources"].get(source_id)
+    if not state or not state.get("last_post_no") or not state.get("last_post_date"):
+        return None
+    return state
+
+
+def save_local_state(state: dict, source_id: str = "lilac", path: str = STATE_FILE):
+    """source별 로컬 상태 저장 (임시 파일에 쓴 뒤 교체)"""
+    data = _read_state_file(path)
+    data["sources"][source_id] = state
+
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️  로컬 상태 저장 실패: {e}")
+
+
+def normalize_post_date(post_date: str) -> str:
+    """게시물 날짜를 YYYY-MM-DD로 통일 ("2025.01.13" / "2025-01-13" 모두 허용)"""
+    try:
+        return format_date_for_db(parse_post_date(str(post_date)))
+    except ValueError:
+        return str(post_date)
+
+
+def is_same_post(state: dict | None, post_no: str, post_date: str) -> bool:
+    """상태(로컬 또는 crawl_state)가 가리키는 게시물과 같은지 비교"""
+    if not state:
+        return False
+    return (
+        str(state.get("last_post_no")) == str(post_no)
+        and normalize_post_date(state.get("last_post_date")) == normalize_post_date(post_date)
+    )
+
+
+def with_post(state: dict | None, post_no: str, post_date: str) -> dict:
+    """기존 로컬 상태에 최신 게시물 정보를 반영한 새 상태 반환"""
+    state = dict(state or {})
+    state["last_post_no"] = post_no
+    state["last_post_date"] = normalize_post_date(post_date)
+    return state
+
+
+def record_skip(state: dict, now: datetime | None = None) -> dict:
+    """스킵 1회를 로컬 상태에 누적"""
+    now_str = (now or datetime.now()).isoformat(timespec="seconds")
+    pending = state.setdefault("pending_skips", {"count": 0, "first_at": now_str, "last_at": now_str})
+    pending["count"] += 1
+    pending["last_at"] = now_str
+    return state
+
+
+def skip_summary_due(state: dict, now: datetime | None = None) -> bool:
+    """누적된 스킵을 crawl_logs에 요약할 시점인지"""
+    pending = state.get("pending_skips")
+    if not pending or not pending.get("count"):
+        return False
+    first_at = datetime.fromisoformat(pending["first_at"])
+    return ((now or datetime.now()) - first_at).total_seconds() >= SKIP_SUMMARY_INTERVAL
+
+
+def skip_summary(state: dict) -> str | None:
+    """누적된 스킵 요약 메시지 (상태는 변경하지 않음)"""
+    pending = state.get("pending_skips")
+    if not pending or not pending.get("count"):
+        return None
+    return f"No new post x{pending['count']} ({pending['first_at']} ~ {pending['last_at']})"
+
+
+def clear_skips(state: dict) -> dict:
+    """요약 기록이 끝난 스킵 누적분 제거"""
+    state.pop("pending_skips", None)
+    return state
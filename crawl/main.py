@@ -1,12 +1,14 @@
 """
 메인 실행 스크립트: 크롤링 → Supabase 업로드 → FCM 알림
 """
+import asyncio
 import os
 import sys
 import traceback
 
 import requests
-from crawler import crawl_menus
+from crawler import CrawlerSession
+from sources import SOURCES
 from supabase_client import (
     get_client,
     get_last_state,
@@ -15,129 +17,288 @@ from supabase_client import (
     log_crawl
 )
 from utils import transform_to_supabase_format
+from local_state import (
+    load_local_state,
+    save_local_state,
+    is_same_post,
+    with_post,
+    normalize_post_date,
+    record_skip,
+    skip_summary_due,
+    skip_summary,
+    clear_skips
+)
 from fcm_notifier import get_fcm_notifier
+from side_effects import SideEffectDispatcher, side_effect
+
+
+# 웹훅/헬스체크 요청용 HTTP 세션 (데몬에서 커넥션 재사용)
+http = requests.Session()
 
 
-def send_discord_error(message: str):
+# ============================================
+# 부가 작업 (side effect) - 핵심 경로와 분리해서 백그라운드 실행
+# ============================================
+
+@side_effect("discord_error", timeout=10, retries=2)
+def send_discord_error(message: str, timeout: float = 10):
     """Discord 웹훅으로 에러 알림 전송"""
     webhook_url = os.environ.get("DISCORD_WEBHOOK_URL")
     if not webhook_url:
         print("⚠️  DISCORD_WEBHOOK_URL 미설정 - Discord 알림 스킵")
         return
-    try:
-        requests.post(webhook_url, json={
-            "embeds": [{
-                "title": "❌ 크롤링 실패",
-                "description": message[:2000],
-                "color": 15548997,
-            }]
-        }, timeout=10)
-    except Exception as e:
-        print(f"⚠️  Discord 알림 전송 실패: {e}")
+    response = http.post(webhook_url, json={
+        "embeds": [{
+            "title": "❌ 크롤링 실패",
+            "description": message[:2000],
+            "color": 15548997,
+        }]
+    }, timeout=timeout)
+    response.raise_for_status()
 
 
-def ping_healthcheck(status: str = "success"):
+# 늦게 도착한 ping은 의미가 없으므로 실패해도 다음 실행에서 재시도하지 않음
+@side_effect("healthcheck", timeout=10, retries=2, replay_max_age=0)
+def ping_healthcheck(status: str = "success", timeout: float = 10):
     """Healthchecks.io에 ping 전송"""
     ping_url = os.environ.get("HC_PING_URL")
     if not ping_url:
         print("⚠️  HC_PING_URL 미설정 - Healthcheck ping 스킵")
         return
-    try:
-        url = ping_url if status == "success" else f"{ping_url}/fail"
-        requests.get(url, timeout=10)
-    except Exception as e:
-        print(f"⚠️  Healthcheck ping 실패: {e}")
+    url = ping_url if status == "success" else f"{ping_url}/fail"
+    http.get(url, timeout=timeout).raise_for_status()
 
 
-def main(headless: bool = True, force: bool = False):
-    """
-    메인 실행 함수
+@side_effect("api_refresh", timeout=10, retries=2)
+def notify_api_refresh(timeout: float = 10):
+    """API 서버에 새 식단 업로드를 알려 응답을 미리 빌드하게 함 (POST /internal/refresh)"""
+    refresh_url = os.environ.get("API_REFRESH_URL")
+    token = os.environ.get("INTERNAL_API_TOKEN")
+    if not refresh_url or not token:
+        print("⚠️  API_REFRESH_URL 또는 INTERNAL_API_TOKEN 미설정 - API refresh 스킵")
+        return
+    response = http.post(refresh_url, headers={"X-Internal-Token": token}, timeout=timeout)
+    response.raise_for_status()
+    print(f"✅ API refresh 완료: {response.json().get('payloads')}")
 
-    Args:
-        headless: 브라우저 headless 모드 (기본: True)
-        force: 강제 실행 (상태 비교 없이 크롤링)
-    """
-    print("=" * 60)
-    print("부경대 식단 크롤러 시작")
-    print("=" * 60)
 
-    # 1. Supabase 클라이언트 생성
-    try:
-        client = get_client()
-        print("✅ Supabase 연결 성공")
-    except ValueError as e:
-        print(f"❌ Supabase 연결 실패: {e}")
-        raise
+# 하루 넘게 지난 새 식단 알림은 보내지 않음
+# firebase_admin의 HTTP timeout(fcm_notifier.FCM_HTTP_TIMEOUT) 외에 디스패처가 시도당 15초로 제한
+@side_effect("fcm_new_menu", timeout=15, retries=2, replay_max_age=24 * 3600)
+def send_fcm_notification(post_no: str, post_date: str, menu_count: int):
+    """FCM 새 식단 푸시 알림 전송 (post_no별 collapse key라서 재전송돼도 기기에는 1개만 표시)"""
+    print("\n📲 FCM 알림 전송 중...")
+    fcm_notifier = get_fcm_notifier()
+    if not fcm_notifier.initialized:
+        print("⚠️  FCM 초기화 실패 - 알림 전송 스킵")
+        return
+    if not fcm_notifier.send_new_menu_notification(post_no=post_no, post_date=post_date, menu_count=menu_count):
+        raise RuntimeError("FCM 알림 전송 실패")
+    print("✅ FCM 알림 전송 성공")
 
-    # 2. 마지막 크롤링 상태 조회
-    last_state = get_last_state(client)
-    if last_state:
-        print(f"📋 마지막 크롤링: post_no={last_state['last_post_no']}, post_date={last_state['last_post_date']}")
-    else:
-        print("📋 이전 크롤링 기록 없음 (첫 실행)")
 
-    # 3. 크롤링 실행
-    try:
-        menus_data, post_no, post_date = crawl_menus(headless=headless)
-        print(f"\n📥 크롤링 완료: {len(menus_data)}개 메뉴")
-    except Exception as e:
-        print(f"❌ 크롤링 실패: {e}")
-        log_crawl(client, "error", str(e))
-        raise
+# Supabase 클라이언트에는 요청별 timeout을 줄 수 없으므로 디스패처가 시도당 15초로 제한
+@side_effect("log_crawl", timeout=15, retries=2)
+def write_crawl_log(status: str, message: str, post_no: str = None, post_date: str = None,
+                    new_data: bool = False):
+    """crawl_logs 기록"""
+    log_crawl(get_connected_client(), status, message, post_no, post_date, new_data)
+
 
-    # 4. 새 게시물인지 확인
-    if not force and last_state:
-        if post_no == last_state['last_post_no'] and post_date == last_state['last_post_date']:
-            print("\n⏭️  새 게시물 없음 - 스킵")
-            log_crawl(client, "skipped", "No new post", post_no, post_date)
-            return
+effects = SideEffectDispatcher()
 
-    # 5. 데이터 변환 (Supabase 스키마에 맞게)
+
+def publish_menus(client, menus_data: list[dict], post_no: str, post_date: str, source: dict):
+    """
+    source 1개의 크롤링 결과를 변환 → 업로드 → 상태 업데이트까지 처리하고
+    로그 / API refresh / FCM 알림은 side effect로 예약
+
+    main()과 데몬(daemon.py)이 공통으로 사용
+    """
+    # 1. 데이터 변환 (Supabase 스키마에 맞게)
     try:
         supabase_data = transform_to_supabase_format(menus_data, post_date)
         print(f"\n🔄 데이터 변환 완료: {len(supabase_data)}개")
     except Exception as e:
         print(f"❌ 데이터 변환 실패: {e}")
-        log_crawl(client, "error", f"Transform failed: {e}", post_no, post_date)
+        effects.submit("log_crawl", status="error", message=f"Transform failed: {e}", post_no=post_no, post_date=post_date)
         raise
 
-    # 6. Supabase에 업로드
+    # 2. Supabase에 업로드
     try:
-        upsert_menus(client, supabase_data)
-        print("✅ Supabase 업로드 성공")
+        changed = upsert_menus(client, supabase_data)
+        print("✅ Supabase 업로드 성공" if changed else "ℹ️  이미 같은 식단이 있음 - 알림 생략")
     except Exception as e:
         print(f"❌ Supabase 업로드 실패: {e}")
-        log_crawl(client, "error", f"Upload failed: {e}", post_no, post_date)
+        effects.submit("log_crawl", status="error", message=f"Upload failed: {e}", post_no=post_no, post_date=post_date)
         raise
 
-    # 7. 상태 업데이트
-    update_state(client, post_no, post_date)
+    # 3. 상태 업데이트
+    update_state(client, post_no, post_date, state_id=source['state_id'])
+    save_local_state(with_post(load_local_state(source['id']), post_no, post_date), source['id'])
     print("✅ 상태 업데이트 완료")
 
-    # 8. 성공 로그 기록
-    log_crawl(client, "success", f"Uploaded {len(supabase_data)} menus", post_no, post_date, new_data=True)
+    # 같은 게시물을 다시 크롤링한 경우 (상태 유실 등): 새 데이터 로그 / prewarm / 푸시 알림 생략
+    if not changed:
+        effects.submit(
+            "log_crawl", status="skipped", message="Re-crawled post with no menu changes",
+            post_no=post_no, post_date=post_date
+        )
+        return
 
-    # 9. FCM 푸시 알림 전송
-    try:
-        print("\n📲 FCM 알림 전송 중...")
-        fcm_notifier = get_fcm_notifier()
-        
-        if fcm_notifier.initialized:
-            success = fcm_notifier.send_new_menu_notification(
-                post_no=post_no,
-                post_date=post_date,
-                menu_count=len(supabase_data)
-            )
-            
-            if success:
-                print("✅ FCM 알림 전송 성공")
-            else:
-                print("⚠️  FCM 알림 전송 실패 (크롤링은 정상 완료)")
-        else:
-            print("⚠️  FCM 초기화 실패 - 알림 전송 스킵")
-    except Exception as e:
-        # FCM 알림 실패는 치명적이지 않으므로 로그만 남기고 계속 진행
-        print(f"⚠️  FCM 알림 전송 중 오류 발생: {e}")
+    # 4. 성공 로그 기록
+    effects.submit(
+        "log_crawl", status="success", message=f"Uploaded {len(supabase_data)} menus",
+        post_no=post_no, post_date=post_date, new_data=True
+    )
+
+    # 5. API 서버 prewarm → FCM 푸시 알림 (알림으로 사용자가 몰리기 전에 prewarm이 끝나도록 순서 보장)
+    refresh = effects.submit("api_refresh")
+    effects.submit(
+        "fcm_new_menu", after=refresh,
+        post_no=post_no, post_date=post_date, menu_count=len(supabase_data)
+    )
+
+
+_client = None
+
+
+def get_connected_client():
+    """Supabase 클라이언트 생성 (처음 필요할 때 1번만, 실패 시 로그 후 예외 전파)"""
+    global _client
+    if _client is None:
+        try:
+            _client = get_client()
+            print("✅ Supabase 연결 성공")
+        except ValueError as e:
+            print(f"❌ Supabase 연결 실패: {e}")
+            raise
+    return _client
+
+
+def record_local_skip(local_state: dict, source: dict, post_no: str, post_date: str):
+    """
+    스킵을 로컬 상태에 누적하고, 주기가 되면 crawl_logs에 요약 1건만 기록
+    (요약 시점이 아니면 DB 호출 없음)
+    """
+    record_skip(local_state)
+    if skip_summary_due(local_state):
+        summary = skip_summary(local_state)
+        # 기록에 실패하면 side effect 실패 기록으로 남아 다음 실행에서 재시도됨
+        effects.submit(
+            "log_crawl", status="skipped", message=summary,
+            post_no=post_no, post_date=normalize_post_date(post_date)
+        )
+        clear_skips(local_state)
+        print(f"📝 [{source['id']}] 스킵 요약 기록: {summary}")
+    save_local_state(local_state, source['id'])
+
+
+def needs_crawl(source: dict, post_no: str, post_date: str, force: bool) -> bool:
+    """
+    probe 결과로 상세 크롤링이 필요한지 판단
+
+    1. 로컬 상태와 같으면 DB 호출 없이 스킵
+    2. 다르면 Supabase crawl_state와 대조 (로컬 상태만 뒤처진 경우 동기화 후 스킵)
+    """
+    sid = source['id']
+    if force:
+        return True
+
+    local_state = load_local_state(sid)
+    if is_same_post(local_state, post_no, post_date):
+        print(f"⏭️  [{sid}] 새 게시물 없음 (로컬 상태 기준) - 스킵")
+        record_local_skip(local_state, source, post_no, post_date)
+        return False
+
+    last_state = get_last_state(get_connected_client(), source['state_id'])
+    if last_state:
+        print(f"📋 [{sid}] 마지막 크롤링: post_no={last_state['last_post_no']}, post_date={last_state['last_post_date']}")
+    else:
+        print(f"📋 [{sid}] 이전 크롤링 기록 없음 (첫 실행)")
+
+    if is_same_post(last_state, post_no, post_date):
+        print(f"⏭️  [{sid}] 새 게시물 없음 (Supabase 상태 기준) - 로컬 상태 동기화 후 스킵")
+        local_state = with_post(local_state, last_state['last_post_no'], last_state['last_post_date'])
+        record_local_skip(local_state, source, post_no, post_date)
+        return False
+
+    return True
+
+
+async def crawl_changed_sources(headless: bool, force: bool) -> tuple[list[tuple[dict, tuple]], list[str]]:
+    """
+    하나의 브라우저에서 모든 source를 동시에 probe → 변경된 source만 동시에 크롤링
+
+    Returns: (crawled, errors)
+        - crawled: [(source, (menus_data, post_no, post_date)), ...]
+        - errors: 실패한 source별 에러 메시지
+    """
+    errors = []
+    to_crawl = []
+
+    async with CrawlerSession(headless=headless) as session:
+        # 1. 모든 source 목록 페이지 probe (최신 게시물 번호/날짜만 확인)
+        probes = await session.probe_all(SOURCES)
+        for source in SOURCES:
+            sid = source['id']
+            result = probes[sid]
+            if isinstance(result, Exception):
+                print(f"❌ [{sid}] 목록 페이지 확인 실패: {result}")
+                effects.submit("log_crawl", status="error", message=f"[{sid}] {result}")
+                errors.append(f"[{sid}] 목록 페이지 확인 실패: {result}")
+                continue
+
+            post_no, post_date = result
+            print(f"🔎 [{sid}] 최신 게시물: post_no={post_no}, post_date={post_date}")
+            if needs_crawl(source, post_no, post_date, force):
+                to_crawl.append(source)
+
+        # 2. 변경된 source만 상세 크롤링 (probe에 사용한 페이지 재사용)
+        results = await session.crawl_all(to_crawl) if to_crawl else {}
+
+    crawled = []
+    for source in to_crawl:
+        sid = source['id']
+        result = results[sid]
+        if isinstance(result, Exception):
+            print(f"❌ [{sid}] 크롤링 실패: {result}")
+            effects.submit("log_crawl", status="error", message=f"[{sid}] {result}")
+            errors.append(f"[{sid}] 크롤링 실패: {result}")
+            continue
+        print(f"\n📥 [{sid}] 크롤링 완료: {len(result[0])}개 메뉴")
+        crawled.append((source, result))
+
+    return crawled, errors
+
+
+def main(headless: bool = True, force: bool = False):
+    """
+    메인 실행 함수
+
+    source별로 로컬 상태(state.json)와 probe 결과가 같으면 DB 호출 없이 스킵하고,
+    다를 때만 Supabase crawl_state와 대조한 뒤 상세 페이지를 크롤링한다.
+    한 source가 실패해도 나머지는 계속 처리하고, 마지막에 실패를 모아서 예외로 올린다.
+
+    Args:
+        headless: 브라우저 headless 모드 (기본: True)
+        force: 강제 실행 (상태 비교 없이 크롤링)
+    """
+    print("=" * 60)
+    print("부경대 식단 크롤러 시작")
+    print("=" * 60)
+
+    crawled, errors = asyncio.run(crawl_changed_sources(headless, force))
+
+    # 변환 → 업로드 → 상태 업데이트 → 알림 (source별)
+    for source, (menus_data, post_no, post_date) in crawled:
+        try:
+            publish_menus(get_connected_client(), menus_data, post_no, post_date, source)
+        except Exception as e:
+            errors.append(f"[{source['id']}] 업로드 실패: {e}")
+
+    if errors:
+        raise RuntimeError("\n".join(errors))
 
     print("\n" + "=" * 60)
     print("✅ 크롤링 완료!")
@@ -154,11 +315,20 @@ if __name__ == "__main__":
     if force:
         print("⚡ 강제 실행 모드")
 
+    # 이전 실행에서 실패한 알림/로그 재시도
+    effects.replay_failed()
+
+    exit_code = 0
     try:
         main(headless=headless, force=force)
-        ping_healthcheck("success")
+        effects.submit("healthcheck", status="success")
     except Exception as e:
         print(f"❌ 크롤링 실패: {traceback.format_exc()}")
-        send_discord_error(str(e))
-        ping_healthcheck("fail")
-        sys.exit(1)
+        effects.submit("discord_error", message=str(e))
+        effects.submit("healthcheck", status="fail")
+        exit_code = 1
+    finally:
+        # 부가 작업 실패는 크롤링 결과(exit code)에 영향을 주지 않음
+        effects.shutdown()
+
+    sys.exit(exit_code)
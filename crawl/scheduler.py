@@ -0,0 +1,259 @@
+"""
+적응형 polling 스케줄러: crawl_logs 이력으로 식단 게시 시간대를 학습
+
+- new_data=true 로그의 crawled_at(KST)을 요일/시간 구간별로 집계
+- 게시가 몰리는 시간대(window)에는 촘촘하게 polling
+- window가 끝난 뒤에는 지수적으로 간격을 늘림 (다음 window 시작 시점은 넘기지 않음)
+
+주의 - 학습 데이터의 편향:
+    crawled_at은 게시 시각이 아니라 크롤러가 게시물을 '감지한' 시각이다.
+    게시 시각은 (이전 polling, 감지 시각] 사이 어딘가이므로, 크론 시절 로그는 크론 슬롯에,
+    --adaptive 데몬 로그는 이미 학습된 window에 몰리게 되고 스케줄이 스스로를 강화한다.
+    이를 줄이기 위해 감지 1건의 확률 질량을 감지 시각 이전 detection_lag초 구간에 고르게 나눈다.
+    (window 밖에서도 최대 max_interval 간격으로는 polling하므로 기본값은 max_interval과 같게 둠)
+    크론 슬롯 사이 간격(최대 하루)만큼의 지연은 보정하지 못하므로, 데몬 운영 기간이 길어질수록 정확해진다.
+
+사용법:
+    python scheduler.py            # 학습된 스케줄 출력
+"""
+import re
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from supabase_client import get_client, get_new_data_logs
+
+
+KST = ZoneInfo("Asia/Seoul")
+DAYS = ['월', '화', '수', '목', '금', '토', '일']
+
+BIN_MINUTES = 15                              # 집계 구간 크기 (분)
+BINS_PER_DAY = 24 * 60 // BIN_MINUTES
+BINS_PER_WEEK = 7 * BINS_PER_DAY
+
+# 이력이 없을 때 사용할 기본 window: 기존 크론 슬롯 (평일 9~11시 KST)
+DEFAULT_WINDOWS = [(weekday, 9, 12) for weekday in range(5)]
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Supabase TIMESTAMPTZ 문자열을 KST datetime으로 변환"""
+    value = value.replace("Z", "+00:00")
+    # Python 3.10의 fromisoformat은 소수점 이하 6자리만 허용하므로 보정
+    value = re.sub(r"\.(\d+)", lambda m: "." + m.group(1)[:6].ljust(6, "0"), value)
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=KST)
+    return dt.astimezone(KST)
+
+
+def week_bin(dt: datetime) -> int:
+    """KST 기준 주간 구간 인덱스 (월요일 00:00 = 0)"""
+    dt = dt.astimezone(KST)
+    return dt.weekday() * BINS_PER_DAY + (dt.hour * 60 + dt.minute) // BIN_MINUTES
+
+
+def format_bin(index: int) -> str:
+    """구간 인덱스를 '월 09:15' 형식으로 변환"""
+    day, offset = divmod(index % BINS_PER_WEEK, BINS_PER_DAY)
+    minutes = offset * BIN_MINUTES
+    return f"{DAYS[day]} {minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class AdaptiveSchedule:
+    """
+    게시 시간 분포 기반 polling 간격 계산기
+
+    Args:
+        timestamps: 새 데이터가 감지된 시각 목록 (게시 시각 아님)
+        dense_interval: window 안에서의 polling 간격 (초)
+        max_interval: window 밖에서의 최대 polling 간격 (초)
+        detection_lag: 감지 시각 이전 몇 초 구간에 게시 확률을 나눠 줄지 (None이면 max_interval)
+        coverage: window가 덮어야 할 게시 확률 질량 (0~1)
+        smoothing_bins: 커널 스무딩 반경 (구간 수)
+        lead_bins: window 시작 전에 미리 촘촘하게 polling할 구간 수
+    """
+
+    def __init__(
+        self,
+        timestamps: list[datetime],
+        dense_interval: int = 120,
+        max_interval: int = 3600,
+        coverage: float = 0.9,
+        smoothing_bins: int = 2,
+        lead_bins: int = 1,
+        detection_lag: int | None = None,
+    ):
+        self.dense_interval = dense_interval
+        self.max_interval = max_interval
+        self.detection_lag = max_interval if detection_lag is None else detection_lag
+        self.coverage = coverage
+        self.smoothing_bins = smoothing_bins
+        self.lead_bins = lead_bins
+        self.sample_count = len(timestamps)
+        self.density = self._build_density(timestamps)
+        self.window_bins = self._select_windows()
+
+    # ----------------------------------------
+    # 분포 모델링
+    # ----------------------------------------
+
+    def _build_density(self, timestamps: list[datetime]) -> list[float]:
+        """
+        요일/시간 구간별 게시 확률 분포 (삼각 커널 스무딩, 주 단위 순환)
+
+        감지 1건은 [감지 시각 - detection_lag, 감지 시각] 구간들에 1/n씩 나눠서 집계
+        """
+        counts = [0.0] * BINS_PER_WEEK
+        if timestamps:
+            lag_bins = self.detection_lag // (BIN_MINUTES * 60)
+            for ts in timestamps:
+                end = week_bin(ts)
+                for offset in range(lag_bins + 1):
+                    counts[(end - offset) % BINS_PER_WEEK] += 1 / (lag_bins + 1)
+        else:
+            for weekday, start_hour, end_hour in DEFAULT_WINDOWS:
+                start = weekday * BINS_PER_DAY + start_hour * 60 // BIN_MINUTES
+                end = weekday * BINS_PER_DAY + end_hour * 60 // BIN_MINUTES
+                for index in range(start, end):
+                    counts[index] += 1
+
+        radius = self.smoothing_bins
+        density = [0.0] * BINS_PER_WEEK
+        for index, count in enumerate(counts):
+            if not count:
+                continue
+            for offset in range(-radius, radius + 1):
+                weight = (radius + 1 - abs(offset)) / (radius + 1)
+                density[(index + offset) % BINS_PER_WEEK] += count * weight
+
+        total = sum(density)
+        return [value / total for value in density] if total else density
+
+    def _select_windows(self) -> set[int]:
+        """확률이 높은 구간부터 coverage만큼 선택하고 lead_bins만큼 앞으로 확장"""
+        ranked = sorted(range(BINS_PER_WEEK), key=lambda i: self.density[i], reverse=True)
+        selected = set()
+        mass = 0.0
+        for index in ranked:
+            if mass >= self.coverage or self.density[index] <= 0:
+                break
+            selected.add(index)
+            mass += self.density[index]
+
+        expanded = set(selected)
+        for index in selected:
+            for lead in range(1, self.lead_bins + 1):
+                expanded.add((index - lead) % BINS_PER_WEEK)
+        return expanded
+
+    # ----------------------------------------
+    # polling 간격 계산
+    # ----------------------------------------
+
+    def in_window(self, now: datetime) -> bool:
+        return week_bin(now) in self.window_bins
+
+    def _bins_since_window(self, index: int) -> int:
+        """마지막 window 구간 이후 지난 구간 수"""
+        for distance in range(BINS_PER_WEEK):
+            if (index - distance) % BINS_PER_WEEK in self.window_bins:
+                return distance
+        return BINS_PER_WEEK
+
+    def _seconds_until_window(self, now: datetime) -> float:
+        """다음 window 시작까지 남은 초"""
+        index = week_bin(now)
+        for distance in range(1, BINS_PER_WEEK + 1):
+            if (index + distance) % BINS_PER_WEEK in self.window_bins:
+                bin_start = now.astimezone(KST).replace(second=0, microsecond=0)
+                bin_start -= timedelta(minutes=bin_start.minute % BIN_MINUTES)
+                target = bin_start + timedelta(minutes=distance * BIN_MINUTES)
+                return max(0.0, (target - now).total_seconds())
+        return float(self.max_interval)
+
+    def next_delay(self, now: datetime | None = None) -> float:
+        """
+        다음 polling까지 대기 시간 (초)
+
+        - window 안: dense_interval
+        - window 밖: dense_interval * 2^(window 종료 후 지난 구간 수), 최대 max_interval
+        - 어느 경우든 다음 window 시작 시점은 넘기지 않음
+        """
+        now = now or datetime.now(KST)
+        if self.in_window(now):
+            return float(self.dense_interval)
+
+        since = self._bins_since_window(week_bin(now))
+        backoff = self.dense_interval * (2 ** min(since, 16))
+        delay = min(backoff, self.max_interval)
+        return max(float(self.dense_interval), min(delay, self._seconds_until_window(now)))
+
+    # ----------------------------------------
+    # 조회용
+    # ----------------------------------------
+
+    def windows(self) -> list[dict]:
+        """연속된 window 구간을 묶어서 반환 (시작, 종료, 확률 질량)"""
+        result = []
+        index = 0
+        while index < BINS_PER_WEEK:
+            if index not in self.window_bins:
+                index += 1
+                continue
+            start = index
+            mass = 0.0
+            while index < BINS_PER_WEEK and index in self.window_bins:
+                mass += self.density[index]
+                index += 1
+            result.append({
+                "start": format_bin(start),
+                "end": format_bin(index),
+                "probability": round(mass, 4),
+            })
+        return result
+
+    def preview(self, start: datetime | None = None, hours: int = 24) -> list[datetime]:
+        """start부터 hours 동안 예정된 polling 시각 목록"""
+        now = (start or datetime.now(KST)).astimezone(KST)
+        end = now + timedelta(hours=hours)
+        times = []
+        while now < end:
+            times.append(now)
+            now = now + timedelta(seconds=self.next_delay(now))
+        return times
+
+    def describe(self) -> dict:
+        """스케줄 요약 (로그/디버깅용)"""
+        return {
+            "samples": self.sample_count,
+            "bin_minutes": BIN_MINUTES,
+            "dense_interval": self.dense_interval,
+            "max_interval": self.max_interval,
+            "coverage": self.coverage,
+            "windows": self.windows(),
+        }
+
+
+def load_schedule(client=None, limit: int = 1000, **kwargs) -> AdaptiveSchedule:
+    """crawl_logs 이력으로 AdaptiveSchedule 생성"""
+    client = client or get_client()
+    rows = get_new_data_logs(client, limit=limit)
+    timestamps = [parse_timestamp(row['crawled_at']) for row in rows if row.get('crawled_at')]
+    return AdaptiveSchedule(timestamps, **kwargs)
+
+
+if __name__ == "__main__":
+    schedule = load_schedule()
+    summary = schedule.describe()
+
+    print("=" * 60)
+    print(f"적응형 polling 스케줄 (학습 샘플: {summary['samples']}개)")
+    print("=" * 60)
+    for window in summary['windows']:
+        print(f"  {window['start']} ~ {window['end']}  (게시 확률 {window['probability'] * 100:.1f}%)")
+
+    times = schedule.preview(hours=24)
+    print(f"\n향후 24시간 polling 예정: {len(times)}회")
+    for ts in times[:20]:
+        print(f"  {ts.strftime('%m-%d %H:%M')}")
+    if len(times) > 20:
+        print(f"  ... 외 {len(times) - 20}회")
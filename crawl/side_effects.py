@@ -0,0 +1,309 @@
+"""
+부가 작업(side effect) 디스패처: FCM 알림, Discord 웹훅, 헬스체크 ping, 로그 기록 등
+
+- 핵심 경로(크롤링 → 업로드)와 분리해서 제한된 동시 실행 수로 실행
+- effect마다 timeout / 재시도 횟수를 따로 지정 (timeout은 시도 1회마다 디스패처가 강제)
+- 끝내 실패한 effect는 파일에 기록해 두고 다음 실행 시작 시 다시 시도
+- 모든 워커는 daemon 스레드라서 멈춘 effect가 프로세스 종료를 막지 않음
+
+중복 전송 방지:
+    timeout이 지난 시도는 강제로 멈출 수 없으므로 계속 돌면서 늦게 성공할 수 있다.
+    - timeout이 난 effect는 재시도하지 않고 바로 실패 처리
+    - 실패로 기록된 뒤 늦게 성공하면 기록 파일에서 다시 제거
+    - 프로세스가 먼저 끝나 결과를 알 수 없는 경우에 대비해 effect 자체도 멱등하게 작성
+      (예: FCM 알림은 post_no별 collapse key로 전송)
+
+사용법:
+    @side_effect("discord_error", timeout=10, retries=2)
+    def send_discord_error(message: str, timeout: float = 10): ...
+
+    dispatcher = SideEffectDispatcher()
+    dispatcher.replay_failed()
+    dispatcher.submit("discord_error", message="...")
+    dispatcher.drain()
+"""
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, wait
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+
+FAILED_EFFECTS_FILE = os.environ.get(
+    "FAILED_EFFECTS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "failed_effects.json")
+)
+
+DEFAULT_DRAIN_TIMEOUT = 30      # 실행 종료 시 effect 대기 최대 시간 (초)
+
+
+# effect 이름 → 실행 정책
+EFFECTS: dict[str, dict] = {}
+
+
+class EffectTimeout(Exception):
+    """시도 1회가 timeout 안에 끝나지 않음 (호출은 백그라운드에서 계속될 수 있음)"""
+
+
+def side_effect(name: str, timeout: float = 10, retries: int = 2, backoff: float = 1.0, replay_max_age: float = 3 * 24 * 3600):
+    """
+    effect 등록 데코레이터
+
+    Args:
+        name: effect 이름 (실패 기록/재실행 시 키로 사용)
+        timeout: 시도 1회당 제한 시간 (초). 함수가 timeout 인자를 받으면 그대로 전달하고,
+                 받지 않거나 지키지 않아도 디스패처는 이 시간까지만 기다림
+        retries: 실패 시 재시도 횟수 (timeout으로 실패한 경우는 재시도하지 않음)
+        backoff: 재시도 대기 시간 (초, 시도마다 2배)
+        replay_max_age: 실패 기록을 다음 실행에서 재시도할 최대 경과 시간 (0이면 기록하지 않음)
+
+    등록되는 함수는 실패 시 예외를 던져야 하고, kwargs는 JSON 직렬화가 가능해야 한다.
+    """
+    def decorator(fn: Callable[..., Any]):
+        EFFECTS[name] = {
+            "fn": fn,
+            "timeout": timeout,
+            "retries": retries,
+            "backoff": backoff,
+            "replay_max_age": replay_max_age,
+            "accepts_timeout": "timeout" in inspect.signature(fn).parameters,
+        }
+        return fn
+    return decorator
+
+
+class SideEffectDispatcher:
+    """등록된 effect를 백그라운드(daemon) 스레드에서 실행하고 실패를 파일에 남기는 디스패처"""
+
+    def __init__(self, max_workers: int = 4, journal_path: str = FAILED_EFFECTS_FILE):
+        self.journal_path = journal_path
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self._pending: list[tuple[Future, dict]] = []
+
+    # ----------------------------------------
+    # 실행
+    # ----------------------------------------
+
+    def submit(self, name: str, after: Optional[Future] = None, **kwargs) -> Future:
+        """
+        effect 실행 예약
+
+        Args:
+            name: 등록된 effect 이름
+            after: 이 Future가 끝난 뒤에 실행 (성공 여부와 무관, 순서만 보장)
+            kwargs: effect 함수 인자
+        """
+        record = {
+            "id": uuid.uuid4().hex,
+            "name": name,
+            "kwargs": kwargs,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        return self._start(record, after)
+
+    def _start(self, record: dict, after: Optional[Future]) -> Future:
+        future = Future()
+        with self._lock:
+            self._pending.append((future, record))
+        threading.Thread(
+            target=self._worker, args=(future, record, after),
+            name=f"effect-{record['name']}", daemon=True
+        ).start()
+        return future
+
+    def _worker(self, future: Future, record: dict, after: Optional[Future]):
+        future.set_running_or_notify_cancel()
+        policy = EFFECTS.get(record["name"])
+        if policy is None:
+            future.set_exception(KeyError(f"등록되지 않은 effect: {record['name']}"))
+            return
+
+        # 선행 effect 대기는 동시 실행 수에 포함하지 않음
+        if after is not None:
+            wait([after], timeout=policy["timeout"])
+
+        with self._slots:
+            try:
+                result = self._run(record, policy)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def _run(self, record: dict, policy: dict):
+        delay = policy["backoff"]
+        for attempt in range(policy["retries"] + 1):
+            try:
+                return self._attempt(record, policy)
+            except EffectTimeout as e:
+                # 끝나지 않은 시도가 늦게 성공할 수 있으므로 재시도하면 중복 전송될 수 있음
+                record["error"] = str(e)
+                record["attempts"] = record.get("attempts", 0) + 1
+                raise
+            except Exception as e:
+                record["error"] = str(e)
+                record["attempts"] = record.get("attempts", 0) + 1
+                if attempt < policy["retries"]:
+                    print(f"⚠️  {record['name']} 실패 ({attempt + 1}회), {delay:.0f}초 후 재시도: {e}")
+                    time.sleep(delay)
+                    delay *= 2
+        raise RuntimeError(record["error"])
+
+    def _attempt(self, record: dict, policy: dict):
+        """시도 1회: 별도 daemon 스레드에서 호출하고 최대 timeout초만 기다림"""
+        kwargs = dict(record["kwargs"])
+        if policy["accepts_timeout"]:
+            kwargs["timeout"] = policy["timeout"]
+
+        call = Future()
+
+        def target():
+            try:
+                call.set_result(policy["fn"](**kwargs))
+            except BaseException as e:
+                call.set_exception(e)
+
+        threading.Thread(target=target, name=f"effect-{record['name']}-call", daemon=True).start()
+        done, _ = wait([call], timeout=policy["timeout"])
+        if not done:
+            self._on_late_success(call, record)
+            raise EffectTimeout(f"timeout ({policy['timeout']}s)")
+        return call.result()
+
+    def _on_late_success(self, future: Future, record: dict):
+        """아직 실행 중인 호출이 나중에 성공하면 실패 기록에서 제거"""
+        def callback(f: Future):
+            if not f.cancelled() and f.exception() is None:
+                self._resolve(record)
+        future.add_done_callback(callback)
+
+    def drain(self, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> int:
+        """
+        예약된 effect가 끝날 때까지 최대 timeout초 대기 후 실패/미완료 effect를 파일에 기록
+
+        미완료 effect는 계속 실행되며, 나중에 성공하면 기록 파일에서 제거된다.
+
+        Returns: 실패(미완료 포함) effect 수
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        _, not_done = wait([future for future, _ in pending], timeout=timeout)
+
+        failed = []
+        for future, record in pending:
+            if future in not_done:
+                record["error"] = record.get("error") or f"timeout (drain {timeout}s)"
+                self._on_late_success(future, record)
+                failed.append(record)
+            elif future.exception() is not None:
+                failed.append(record)
+
+        for record in failed:
+            print(f"⚠️  {record['name']} 최종 실패: {record.get('error')}")
+        self._persist(failed)
+        return len(failed)
+
+    def shutdown(self, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> int:
+        """
+        남은 effect 처리 후 종료 준비
+
+        워커가 daemon 스레드라서 drain 이후 멈춘 effect는 프로세스 종료를 늦추지 않는다.
+        """
+        return self.drain(timeout)
+
+    # ----------------------------------------
+    # 실패 기록 / 재실행
+    # ----------------------------------------
+
+    def _persist(self, failed: list[dict]):
+        """재시도 대상 실패 effect를 기록 파일에 추가"""
+        with self._lock:
+            replayable = [
+                record for record in failed
+                if not record.get("resolved")
+                and EFFECTS.get(record["name"], {}).get("replay_max_age", 0) > 0
+            ]
+            if not replayable:
+                return
+
+            journal = self._load_journal() + [
+                {key: record[key] for key in ("id", "name", "kwargs", "created_at", "error") if key in record}
+                for record in replayable
+            ]
+            if self._write_journal(journal):
+                for record in replayable:
+                    record["journaled"] = True
+                print(f"💾 실패한 effect {len(replayable)}건 기록 ({self.journal_path})")
+
+    def _resolve(self, record: dict):
+        """늦게 성공한 effect를 기록 파일에서 제거 (아직 기록 전이면 기록하지 않도록 표시)"""
+        with self._lock:
+            record["resolved"] = True
+            if not record.get("journaled"):
+                return
+            journal = self._load_journal()
+            remaining = [entry for entry in journal if entry.get("id") != record["id"]]
+            if len(remaining) != len(journal) and self._write_journal(remaining):
+                print(f"✅ {record['name']} 늦게 성공 - 실패 기록에서 제거")
+
+    def _load_journal(self) -> list[dict]:
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _write_journal(self, journal: list[dict]) -> bool:
+        """기록 파일 교체 (비어 있으면 삭제)"""
+        try:
+            if not journal:
+                if os.path.exists(self.journal_path):
+                    os.remove(self.journal_path)
+                return True
+            tmp_path = f"{self.journal_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(journal, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.journal_path)
+            return True
+        except OSError as e:
+            print(f"⚠️  실패 effect 기록 실패: {e}")
+            return False
+
+    def replay_failed(self) -> int:
+        """
+        이전 실행에서 실패한 effect 재실행 예약 (기록 파일은 비움)
+        replay_max_age가 지난 effect는 버림
+
+        Returns: 재실행 예약한 effect 수
+        """
+        with self._lock:
+            journal = self._load_journal()
+            if not journal:
+                return 0
+            self._write_journal([])
+
+        now = datetime.now()
+        replayed = 0
+        for entry in journal:
+            policy = EFFECTS.get(entry.get("name"))
+            if policy is None:
+                continue
+            age = (now - datetime.fromisoformat(entry["created_at"])).total_seconds()
+            if age > policy["replay_max_age"]:
+                print(f"🗑️  오래된 실패 effect 폐기: {entry['name']} ({entry['created_at']})")
+                continue
+            record = {"id": uuid.uuid4().hex, **entry}
+            self._start(record, None)
+            replayed += 1
+
+        if replayed:
+            print(f"🔁 이전 실행에서 실패한 effect {replayed}건 재시도")
+        return replayed
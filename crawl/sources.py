@@ -0,0 +1,29 @@
+"""
+크롤링 대상 게시판 / 식당 테이블 목록
+
+식당을 추가하려면 SOURCES에 항목을 추가한다.
+- 같은 게시판의 다른 식당: 해당 source의 tables에 {'cafeteria', 'index'} 추가
+- 다른 게시판: 새 source 추가 (state_id는 crawl_state.id로 쓰이므로 겹치지 않게)
+
+모든 source는 하나의 브라우저에서 페이지를 나눠 동시에 크롤링된다.
+"""
+
+SOURCES: list[dict] = [
+    {
+        'id': 'lilac',
+        'state_id': 1,  # 기존 crawl_state(id=1) 행 그대로 사용
+        'list_url': 'https://www.pknu.ac.kr/main/399',
+        'tables': [
+            # index: 상세 페이지의 n번째 <table>
+            {'cafeteria': '라일락', 'index': 2},
+        ],
+    },
+]
+
+
+def get_source(source_id: str) -> dict:
+    """id로 source 조회"""
+    for source in SOURCES:
+        if source['id'] == source_id:
+            return source
+    raise KeyError(f"등록되지 않은 source: {source_id}")
@@ -21,22 +21,22 @@ def get_client() -> Client:
 # crawl_state 테이블 (상태 관리)
 # ============================================
 
-def get_last_state(client: Client) -> dict | None:
+def get_last_state(client: Client, state_id: int = 1) -> dict | None:
     """
-    마지막 크롤링 상태 조회
+    마지막 크롤링 상태 조회 (state_id: source별 crawl_state.id, 라일락 = 1)
     Returns: {'last_post_no': '211', 'last_post_date': '2025-01-13'} or None
     """
-    response = client.table("crawl_state").select("*").eq("id", 1).execute()
+    response = client.table("crawl_state").select("*").eq("id", state_id).execute()
 
     if response.data:
         return response.data[0]
     return None
 
 
-def update_state(client: Client, post_no: str, post_date: str):
+def update_state(client: Client, post_no: str, post_date: str, state_id: int = 1):
     """크롤링 상태 업데이트 (upsert)"""
     client.table("crawl_state").upsert({
-        "id": 1,
+        "id": state_id,
         "last_post_no": post_no,
         "last_post_date": post_date,
         "updated_at": datetime.now().isoformat()
@@ -47,31 +47,71 @@ def update_state(client: Client, post_no: str, post_date: str):
 # menus 테이블 (식단 데이터)
 # ============================================
 
-def upsert_menus(client: Client, menus: list[dict]):
+# upsert / 변경 비교 대상 컬럼 (apply_menu_changes RPC의 INSERT 컬럼과 같아야 함)
+MENU_COLUMNS = ('post_no', 'cafeteria', 'post_date', 'week_start', 'week_end', 'day_of_week', 'menu_date', 'menu_text')
+
+
+def upsert_menus(client: Client, menus: list[dict]) -> bool:
     """
-    메뉴 데이터 upsert (post_no + day_of_week 기준)
+    메뉴 데이터 upsert (post_no + cafeteria + day_of_week 기준)
 
     menus: [
         {
             'post_no': '211',
+            'cafeteria': '라일락',
             'post_date': '2025-01-13',
             'week_start': '2025-01-13',
             'week_end': '2025-01-17',
             'day_of_week': '월',
+            'menu_date': '2025-01-13',
             'menu_text': '...'
         },
         ...
     ]
+
+    Returns: 실제로 바뀐 행이 있었는지 (없으면 업로드 스킵)
+
+    변경 추적 (/menus/changes 용):
+    - 새로 추가되거나 내용이 바뀐 행만 업로드하고, 같은 게시물에서 사라진 요일은 삭제
+    - change_seq는 DB 시퀀스(menu_change_seq)가 INSERT 기본값 / UPDATE 트리거로 부여
+    - upsert / tombstone 기록 / 삭제는 apply_menu_changes RPC 하나(트랜잭션 1개)로 처리
+      (RPC 안에서 advisory lock으로 쓰기를 직렬화해 change_seq 순서 = 커밋 순서, docs/TRD.md 참고)
     """
     if not menus:
-        return
+        return False
+
+    menus = [{column: menu.get(column) for column in MENU_COLUMNS} for menu in menus]
+
+    def menu_key(row: dict) -> tuple[str, str, str]:
+        return row['post_no'], row['cafeteria'], row['day_of_week']
+
+    post_nos = sorted({menu['post_no'] for menu in menus})
+    cafeterias = sorted({menu['cafeteria'] for menu in menus})
+    existing = (
+        client.table("menus").select("*")
+        .in_("post_no", post_nos)
+        .in_("cafeteria", cafeterias)
+        .execute().data
+    )
+    existing_by_key = {menu_key(row): row for row in existing}
+    new_keys = {menu_key(menu) for menu in menus}
+
+    changed = [
+        menu for menu in menus
+        if menu_key(menu) not in existing_by_key
+        or any(existing_by_key[menu_key(menu)].get(k) != v for k, v in menu.items())
+    ]
+    removed = [row for key, row in existing_by_key.items() if key not in new_keys]
 
-    response = client.table("menus").upsert(
-        menus,
-        on_conflict="post_no,day_of_week"
-    ).execute()
+    if not changed and not removed:
+        print("ℹ️  변경된 메뉴 없음 - 업로드 스킵")
+        return False
 
-    return response
+    client.rpc("apply_menu_changes", {
+        "upserts": changed,
+        "removed_ids": [row['id'] for row in removed],
+    }).execute()
+    return True
 
 
 def get_menus_by_week(client: Client, week_start: str) -> list[dict]:
@@ -97,3 +137,16 @@ def log_crawl(client: Client, status: str, message: str, post_no: str = None, po
         "message": message,
         "new_data": new_data
     }).execute()
+
+
+def get_new_data_logs(client: Client, limit: int = 1000) -> list[dict]:
+    """새 데이터가 수집된(new_data=true) 크롤링 로그 조회 (최신순)"""
+    response = (
+        client.table("crawl_logs")
+        .select("crawled_at, post_no, post_date")
+        .eq("new_data", True)
+        .order("crawled_at", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    return response.data
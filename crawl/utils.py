@@ -72,6 +72,7 @@ def transform_to_supabase_format(crawled_data: list[dict], post_date_str: str) -
     [
         {
             'post_no': '211',
+            'cafeteria': '라일락',
             'post_date': '2025-01-13',
             'week_start': '2025-01-13',
             'week_end': '2025-01-17',
@@ -94,6 +95,7 @@ def transform_to_supabase_format(crawled_data: list[dict], post_date_str: str) -
 
         result.append({
             'post_no': item['post_number'],
+            'cafeteria': item['cafeteria'],
             'post_date': format_date_for_db(post_dt),
             'week_start': format_date_for_db(week_start),
             'week_end': format_date_for_db(week_end),
@@ -0,0 +1,388 @@
+"""
+부하 테스트용 로컬 Supabase(PostgREST) 대체 서버
+
+main.py / crawl/ 가 사용하는 범위의 PostgREST 문법만 지원:
+- 테이블: menus, menu_tombstones, crawl_state, crawl_logs (인메모리)
+- GET: select, eq/neq/gt/gte/lt/lte/in 필터, order, limit, Prefer: count=exact
+- POST: insert / upsert (on_conflict + Prefer: resolution=merge-duplicates)
+- DELETE: 필터 조건에 맞는 행 삭제
+- RPC: apply_menu_changes (docs/TRD.md의 함수와 같은 동작)
+- change_seq: menus / menu_tombstones가 공유하는 시퀀스 (INSERT 기본값, 내용이 바뀐 UPDATE 시 새 값)
+
+시드 데이터는 docs/TRD.md 스키마와 같은 컬럼만 사용한다.
+post_date는 실제처럼 게시물이 올라온 날(식단 주 직전 금요일)이고,
+가장 최근 게시물(다음 주 식단)은 오늘 올라온 것으로 두어 /menus/today가
+새 게시물 알림 직후처럼 데이터를 반환하도록 한다.
+
+--latency-ms로 실제 Supabase 왕복 지연을 흉내낼 수 있다.
+
+사용법:
+    python loadtest/fake_supabase.py --port 54321 --years 3 --latency-ms 30
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+# supabase-py의 키 형식 검사를 통과하는 더미 키
+DUMMY_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.loadtest"
+
+DAYS = ['월', '화', '수', '목', '금']
+DISHES = [
+    '돈까스', '제육볶음', '김치찌개', '된장국', '미소국', '계란찜', '샐러드', '잡채',
+    '불고기', '닭갈비', '카레라이스', '짜장면', '떡볶이', '어묵국', '깍두기', '배추김치',
+]
+
+# 테이블별 중복 판단 기본 키 (on_conflict 미지정 시)
+PRIMARY_KEYS = {
+    "menus": ("id",),
+    "menu_tombstones": ("id",),
+    "crawl_state": ("id",),
+    "crawl_logs": ("id",),
+}
+
+# change_seq 시퀀스를 공유하는 테이블
+CHANGE_SEQ_TABLES = ("menus", "menu_tombstones")
+
+# apply_menu_changes RPC가 upsert하는 menus 컬럼
+# (crawl/supabase_client.MENU_COLUMNS와 같아야 함)
+MENU_UPSERT_COLUMNS = ("post_no", "cafeteria", "post_date", "week_start", "week_end", "day_of_week", "menu_date", "menu_text")
+
+# 컬럼 값을 지정하지 않으면 자동으로 채우는 타임스탬프 컬럼
+TIMESTAMP_DEFAULTS = {
+    "menus": "created_at",
+    "menu_tombstones": "deleted_at",
+    "crawl_logs": "crawled_at",
+}
+
+
+class FakeDatabase:
+    """테이블 이름 → 행 목록 (전역 락 하나로 보호)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables: dict[str, list[dict]] = {name: [] for name in PRIMARY_KEYS}
+        self.next_ids: dict[str, int] = {name: 1 for name in PRIMARY_KEYS}
+        self.last_change_seq = 0
+
+    def next_change_seq(self) -> int:
+        """menu_change_seq 시퀀스 nextval"""
+        self.last_change_seq += 1
+        return self.last_change_seq
+
+    def insert(self, table: str, row: dict) -> dict:
+        row = dict(row)
+        if "id" not in row:
+            row["id"] = self.next_ids[table]
+        self.next_ids[table] = max(self.next_ids[table], row["id"] + 1)
+        ts_column = TIMESTAMP_DEFAULTS.get(table)
+        if ts_column and ts_column not in row:
+            row[ts_column] = datetime.now(timezone.utc).isoformat()
+        if table in CHANGE_SEQ_TABLES and "change_seq" not in row:
+            row["change_seq"] = self.next_change_seq()
+        self.tables[table].append(row)
+        return row
+
+    def update(self, table: str, row: dict, values: dict):
+        """행 갱신 (menus는 내용이 바뀌면 change_seq 갱신 - UPDATE 트리거와 같은 동작)"""
+        changed = any(row.get(column) != value for column, value in values.items())
+        row.update(values)
+        if changed and table == "menus":
+            row["change_seq"] = self.next_change_seq()
+
+    def apply_menu_changes(self, upserts: list[dict], removed_ids: list[int]):
+        """apply_menu_changes RPC: upsert + tombstone 기록 + 삭제"""
+        menus = self.tables["menus"]
+        for item in upserts:
+            values = {column: item.get(column) for column in MENU_UPSERT_COLUMNS}
+            key = tuple(values[column] for column in ("post_no", "cafeteria", "day_of_week"))
+            existing = next(
+                (row for row in menus if (row["post_no"], row["cafeteria"], row["day_of_week"]) == key),
+                None
+            )
+            if existing is None:
+                self.insert("menus", {**values, "price": None})
+            else:
+                self.update("menus", existing, values)
+
+        removed = [row for row in menus if row["id"] in removed_ids]
+        for row in removed:
+            self.insert("menu_tombstones", {
+                "menu_id": row["id"],
+                "post_no": row["post_no"],
+                "cafeteria": row["cafeteria"],
+                "day_of_week": row["day_of_week"],
+            })
+        self.tables["menus"] = [row for row in menus if row["id"] not in removed_ids]
+
+    def seed(self, years: int):
+        """years년치 주간 식단 + 크롤링 상태/로그 생성"""
+        today = date.today()
+        monday = today - timedelta(days=today.weekday())
+        week = monday - timedelta(weeks=52 * years)
+        last_week = monday + timedelta(weeks=1)
+        post_no = 1
+
+        while week <= last_week:
+            # 식단은 보통 전 주 금요일에 올라옴, 마지막(다음 주) 게시물은 오늘 올라온 것으로 둠
+            post_date = today if week == last_week else week - timedelta(days=3)
+            for offset, day in enumerate(DAYS):
+                dishes = [DISHES[(post_no * 7 + offset * 3 + i) % len(DISHES)] for i in range(5)]
+                self.insert("menus", {
+                    "post_no": str(post_no),
+                    "cafeteria": "라일락",
+                    "post_date": str(post_date),
+                    "week_start": str(week),
+                    "week_end": str(week + timedelta(days=4)),
+                    "day_of_week": day,
+                    "menu_date": str(week + timedelta(days=offset)),
+                    "menu_text": ", ".join(dishes),
+                    "price": None,
+                })
+            crawled_at = datetime.combine(post_date, datetime.min.time(), timezone.utc) + timedelta(hours=1, minutes=post_no % 50)
+            self.insert("crawl_logs", {
+                "crawled_at": crawled_at.isoformat(),
+                "post_no": str(post_no),
+                "post_date": str(post_date),
+                "status": "success",
+                "message": "Uploaded 5 menus",
+                "new_data": True,
+            })
+            post_no += 1
+            week += timedelta(weeks=1)
+
+        self.insert("crawl_state", {
+            "id": 1,
+            "last_post_no": str(post_no - 1),
+            "last_post_date": str(today),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+
+# ============================================
+# PostgREST 문법 해석
+# ============================================
+
+def parse_list(value: str) -> list[str]:
+    """in.(a,"b c",d) 괄호 안의 값 목록"""
+    inner = value.strip()[1:-1]
+    return [m.group(1) if m.group(1) is not None else m.group(2)
+            for m in re.finditer(r'"((?:[^"\\]|\\.)*)"|([^,]+)', inner)]
+
+
+def coerce(raw: str, sample):
+    """필터 문자열을 행 값과 비교 가능한 타입으로 변환"""
+    if isinstance(sample, bool):
+        return raw == "true"
+    if isinstance(sample, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    if raw == "null":
+        return None
+    return raw
+
+
+def matches(row: dict, filters: list[tuple[str, str, str]]) -> bool:
+    for column, op, raw in filters:
+        value = row.get(column)
+        if op == "is":
+            if (value is None) != (raw == "null"):
+                return False
+            continue
+        if op == "in":
+            if value not in [coerce(item, value) for item in parse_list(raw)]:
+                return False
+            continue
+        target = coerce(raw, value)
+        if value is None:
+            return False
+        if op == "eq" and value != target:
+            return False
+        if op == "neq" and value == target:
+            return False
+        if op == "gt" and not value > target:
+            return False
+        if op == "gte" and not value >= target:
+            return False
+        if op == "lt" and not value < target:
+            return False
+        if op == "lte" and not value <= target:
+            return False
+    return True
+
+
+def apply_order(rows: list[dict], order: str) -> list[dict]:
+    """order=col.desc.nullslast,col2 (뒤쪽 키부터 안정 정렬)"""
+    for part in reversed(order.split(",")):
+        column, *modifiers = part.split(".")
+        desc = "desc" in modifiers
+        nulls_first = "nullsfirst" in modifiers or (desc and "nullslast" not in modifiers)
+        present = [row for row in rows if row.get(column) is not None]
+        missing = [row for row in rows if row.get(column) is None]
+        present.sort(key=lambda row: row[column], reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def project(row: dict, select: str) -> dict:
+    columns = [column.strip() for column in select.split(",")]
+    if "*" in columns:
+        return dict(row)
+    return {column: row.get(column) for column in columns}
+
+
+# ============================================
+# HTTP 핸들러
+# ============================================
+
+class PostgrestHandler(BaseHTTPRequestHandler):
+    db: FakeDatabase = None
+    latency: float = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _rpc(self, body) -> bool:
+        """/rest/v1/rpc/<함수> 처리 (처리했으면 True)"""
+        match = re.match(r"^/rest/v1/rpc/(\w+)$", urlsplit(self.path).path)
+        if not match:
+            return False
+        if match.group(1) != "apply_menu_changes":
+            self._send(404, {"message": f"function not found: {match.group(1)}"})
+            return True
+        with self.db.lock:
+            self.db.apply_menu_changes(body.get("upserts") or [], body.get("removed_ids") or [])
+        self._send(200, None)
+        return True
+
+    def _parse(self) -> tuple[str, dict, list[tuple[str, str, str]]]:
+        url = urlsplit(self.path)
+        match = re.match(r"^/rest/v1/(\w+)$", url.path)
+        if not match or match.group(1) not in self.db.tables:
+            raise LookupError(url.path)
+
+        params, filters = {}, []
+        for key, value in parse_qsl(url.query, keep_blank_values=True):
+            if key in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+                params[key] = value
+            else:
+                op, _, raw = value.partition(".")
+                filters.append((key, op, raw))
+        return match.group(1), params, filters
+
+    def _send(self, status: int, body, headers: dict | None = None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _handle(self, method: str):
+        # keep-alive 연결이므로 DELETE 등 본문을 쓰지 않는 요청도 본문은 항상 읽어서 비움
+        body = self._read_body()
+        if self.latency:
+            time.sleep(self.latency)
+        if method == "POST" and self._rpc(body):
+            return
+        try:
+            table, params, filters = self._parse()
+        except LookupError as e:
+            return self._send(404, {"message": f"relation not found: {e}"})
+
+        prefer = self.headers.get("Prefer", "")
+
+        with self.db.lock:
+            rows = self.db.tables[table]
+            if method == "GET":
+                result = [row for row in rows if matches(row, filters)]
+                total = len(result)
+                if "order" in params:
+                    result = apply_order(result, params["order"])
+                offset = int(params.get("offset", 0))
+                if "limit" in params:
+                    result = result[offset:offset + int(params["limit"])]
+                else:
+                    result = result[offset:]
+                result = [project(row, params.get("select", "*")) for row in result]
+                headers = {}
+                if "count=exact" in prefer:
+                    end = offset + len(result) - 1
+                    headers["Content-Range"] = f"{offset}-{end}/{total}" if result else f"*/{total}"
+                return self._send(200, result, headers)
+
+            if method == "POST":
+                items = body if isinstance(body, list) else [body]
+                conflict = tuple(params["on_conflict"].split(",")) if "on_conflict" in params else PRIMARY_KEYS[table]
+                merge = "resolution=merge-duplicates" in prefer
+                written = []
+                for item in items:
+                    existing = None
+                    if merge and all(column in item for column in conflict):
+                        existing = next((row for row in rows if all(row.get(c) == item[c] for c in conflict)), None)
+                    if existing is not None:
+                        self.db.update(table, existing, item)
+                        written.append(dict(existing))
+                    else:
+                        written.append(dict(self.db.insert(table, item)))
+                return self._send(201, written)
+
+            if method == "DELETE":
+                removed = [row for row in rows if matches(row, filters)]
+                self.db.tables[table] = [row for row in rows if not matches(row, filters)]
+                return self._send(200, removed)
+
+        return self._send(405, {"message": "method not allowed"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+def serve(host: str, port: int, years: int, latency_ms: float) -> ThreadingHTTPServer:
+    """시드 데이터를 채운 서버 생성 (serve_forever는 호출하지 않음)"""
+    db = FakeDatabase()
+    db.seed(years)
+    handler = type("Handler", (PostgrestHandler,), {"db": db, "latency": latency_ms / 1000})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 Supabase(PostgREST) 대체 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--years", type=int, default=3, help="시드할 식단 기간 (년)")
+    parser.add_argument("--latency-ms", type=float, default=30, help="요청마다 추가할 지연 (ms)")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.years, args.latency_ms)
+    counts = {name: len(rows) for name, rows in server.RequestHandlerClass.db.tables.items()}
+    print(f"✅ Fake Supabase 실행: http://{args.host}:{args.port} (지연 {args.latency_ms}ms)")
+    print(f"   시드 데이터: {counts}")
+    print(f"   SUPABASE_URL=http://{args.host}:{args.port}")
+    print(f"   SUPABASE_SERVICE_ROLE_KEY={DUMMY_KEY}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,202 @@
+"""
+API 부하 테스트: 지정한 동시성으로 엔드포인트를 호출하고 처리량 / 지연 시간 분위수 출력
+
+사용법:
+    # 1) 로컬 Supabase 대체 서버
+    python loadtest/fake_supabase.py --port 54321 --years 3 --latency-ms 30
+
+    # 2) API 서버 (대체 서버를 바라보도록, 요청 제한은 끔)
+    SUPABASE_URL=http://127.0.0.1:54321 \\
+    SUPABASE_SERVICE_ROLE_KEY=<fake_supabase.py가 출력한 키> \\
+    RATE_LIMIT_ENABLED=0 INTERNAL_API_TOKEN=loadtest \\
+    uvicorn main:app --port 8000
+
+    # 3) 부하 생성
+    python loadtest/run.py --concurrency 50 --duration 20
+    python loadtest/run.py --endpoints today,stats --concurrency 200 --json result.json
+
+    # 크롤러 업로드 직후처럼 /internal/refresh로 사전 빌드 페이로드를 갱신한 뒤 측정
+    INTERNAL_API_TOKEN=loadtest python loadtest/run.py --prewarm
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+import requests
+
+
+def current_week_start() -> str:
+    today = date.today()
+    return str(today - timedelta(days=today.weekday()))
+
+
+# 엔드포인트 이름 → 경로
+ENDPOINTS = {
+    "today": "/menus/today",
+    "week": f"/menus/week/{current_week_start()}",
+    "menus": "/menus?limit=100",
+    "stats": "/stats",
+}
+
+
+def prewarm(base_url: str, token: str, timeout: float) -> dict:
+    """POST /internal/refresh로 오늘/이번 주/다음 주 응답을 미리 빌드 (크롤러 업로드 직후와 같은 상태)"""
+    response = requests.post(
+        base_url.rstrip("/") + "/internal/refresh",
+        headers={"X-Internal-Token": token},
+        timeout=timeout
+    )
+    response.raise_for_status()
+    return response.json()["payloads"]
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """정렬된 값에서 pct 분위수 (nearest-rank)"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class LoadRunner:
+    """
+    worker 스레드마다 HTTP 세션을 하나씩 두고 엔드포인트를 번갈아 호출
+
+    - duration초 동안 실행하거나 (requests_per_worker 지정 시) 정해진 횟수만 호출
+    - 5xx와 연결 오류는 실패, 그 외(404/429 포함)는 상태 코드별로 집계
+    """
+
+    def __init__(self, base_url: str, endpoints: list[str], concurrency: int, duration: float, requests_per_worker: int | None, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.endpoints = endpoints
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests_per_worker = requests_per_worker
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.errors: dict[str, Counter] = defaultdict(Counter)
+        self.elapsed = 0.0
+
+    def _worker(self, index: int, deadline: float):
+        session = requests.Session()
+        latencies, statuses, errors = defaultdict(list), defaultdict(Counter), defaultdict(Counter)
+        count = 0
+        while True:
+            if self.requests_per_worker is not None:
+                if count >= self.requests_per_worker:
+                    break
+            elif time.monotonic() >= deadline:
+                break
+
+            name = self.endpoints[(index + count) % len(self.endpoints)]
+            count += 1
+            started = time.perf_counter()
+            try:
+                response = session.get(self.base_url + ENDPOINTS[name], timeout=self.timeout)
+                latencies[name].append((time.perf_counter() - started) * 1000)
+                statuses[name][response.status_code] += 1
+            except requests.RequestException as e:
+                errors[name][type(e).__name__] += 1
+
+        with self._lock:
+            for name in self.endpoints:
+                self.latencies[name].extend(latencies[name])
+                self.statuses[name].update(statuses[name])
+                self.errors[name].update(errors[name])
+
+    def run(self):
+        started = time.monotonic()
+        deadline = started + self.duration
+        threads = [threading.Thread(target=self._worker, args=(i, deadline)) for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.monotonic() - started
+
+    def report(self) -> dict:
+        """엔드포인트별 / 전체 처리량과 지연 시간 분위수 (ms)"""
+        def summarize(latencies: list[float], statuses: Counter, errors: Counter) -> dict:
+            values = sorted(latencies)
+            failed = sum(count for status, count in statuses.items() if status >= 500) + sum(errors.values())
+            return {
+                "requests": len(values) + sum(errors.values()),
+                "failed": failed,
+                "rps": round(len(values) / self.elapsed, 1) if self.elapsed else 0.0,
+                "p50": round(percentile(values, 50), 1),
+                "p90": round(percentile(values, 90), 1),
+                "p99": round(percentile(values, 99), 1),
+                "max": round(values[-1], 1) if values else 0.0,
+                "statuses": {str(status): count for status, count in sorted(statuses.items())},
+                "errors": dict(errors),
+            }
+
+        result = {
+            "concurrency": self.concurrency,
+            "elapsed": round(self.elapsed, 2),
+            "endpoints": {
+                name: summarize(self.latencies[name], self.statuses[name], self.errors[name])
+                for name in self.endpoints
+            },
+        }
+        result["total"] = summarize(
+            [value for name in self.endpoints for value in self.latencies[name]],
+            sum((self.statuses[name] for name in self.endpoints), Counter()),
+            sum((self.errors[name] for name in self.endpoints), Counter()),
+        )
+        return result
+
+
+def print_report(report: dict):
+    print("=" * 78)
+    print(f"동시성 {report['concurrency']} / 실행 시간 {report['elapsed']}초")
+    print("=" * 78)
+    print(f"{'endpoint':<10}{'requests':>10}{'failed':>8}{'rps':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  statuses")
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for name, stats in rows:
+        statuses = ", ".join(f"{code}:{count}" for code, count in stats["statuses"].items())
+        print(
+            f"{name:<10}{stats['requests']:>10}{stats['failed']:>8}{stats['rps']:>9}"
+            f"{stats['p50']:>9}{stats['p90']:>9}{stats['p99']:>9}{stats['max']:>9}  {statuses}"
+        )
+    print("(지연 시간 단위: ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="식단 API 부하 테스트")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"쉼표로 구분 ({', '.join(ENDPOINTS)})")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10, help="실행 시간 (초)")
+    parser.add_argument("--requests", type=int, default=None, help="worker당 요청 수 (지정 시 --duration 무시)")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--json", default=None, help="결과를 JSON 파일로 저장")
+    parser.add_argument("--prewarm", action="store_true", help="측정 전에 /internal/refresh 호출")
+    parser.add_argument("--internal-token", default=os.environ.get("INTERNAL_API_TOKEN"), help="--prewarm용 토큰")
+    args = parser.parse_args()
+
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"알 수 없는 엔드포인트: {', '.join(unknown)}")
+
+    if args.prewarm:
+        if not args.internal_token:
+            parser.error("--prewarm에는 --internal-token 또는 INTERNAL_API_TOKEN이 필요합니다.")
+        print(f"🔥 사전 빌드 완료: {prewarm(args.base_url, args.internal_token, args.timeout)}")
+
+    runner = LoadRunner(args.base_url, endpoints, args.concurrency, args.duration, args.requests, args.timeout)
+    runner.run()
+    report = runner.report()
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json}")
@@ -1,9 +1,18 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List
+from fastapi.responses import JSONResponse, StreamingResponse
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Hashable, List, Optional
 from pydantic import BaseModel
 from supabase import create_client, Client
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+import asyncio
+import hmac
+import json
+import math
+import threading
+import time
 import traceback
 import os
 
@@ -31,6 +40,9 @@ load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")  # 크롤러 → /internal/* 호출 인증용
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"  # 부하 테스트 시 0으로 끔
+PREBUILT_MAX_AGE = float(os.getenv("PREBUILT_MAX_AGE", "600"))  # 사전 빌드 응답 최대 사용 시간 (초)
 
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     raise ValueError("❌ .env 파일에 SUPABASE_URL 또는 SUPABASE_SERVICE_ROLE_KEY가 없습니다.")
@@ -58,6 +70,583 @@ def get_db() -> Client:
     return supabase
 
 
+# ============================================
+# 요청 병합 (single-flight)
+# ============================================
+
+class _InFlightCall:
+    """진행 중인 백엔드 호출 1건 (결과/에러를 대기자들과 공유)"""
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 요청들을 하나의 백엔드 호출로 병합
+
+    - 먼저 들어온 요청(leader)만 실제로 fn을 실행하고,
+      실행 중에 같은 키로 들어온 요청들은 그 결과(또는 에러)를 그대로 받는다.
+    - 호출이 끝나면 키가 즉시 제거되므로 캐시가 아니다 (결과가 오래 남지 않음).
+    - 동기 핸들러(스레드풀)에서 사용한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _InFlightCall] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """같은 키의 호출이 진행 중이면 끝날 때까지 기다렸다가 결과 공유"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+
+coalescer = SingleFlight()
+
+
+# ============================================
+# 독립 쿼리 병렬 실행 (fan-out)
+# ============================================
+
+FANOUT_TIMEOUT = 5.0  # 병렬 실행 전체에 적용되는 공유 deadline (초)
+
+class FanoutPool:
+    """
+    호출 지점별 fan-out 스레드 풀
+
+    실행 중인 호출은 취소할 수 없어서, 시간 초과한 호출도 백엔드가 응답할 때까지 워커를 계속 점유한다.
+    호출 지점마다 풀을 나눠서 한 곳(/stats 등)의 멈춘 호출이 다른 엔드포인트를 막지 않게 하고,
+    실행 중인 워커 수(busy)로 풀 포화를 감지한다.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.busy = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"fanout-{name}")
+
+    def submit(self, fn: Callable[[], Any]) -> Future:
+        def run():
+            with self._lock:
+                self.busy += 1
+            try:
+                return fn()
+            finally:
+                with self._lock:
+                    self.busy -= 1
+        return self._executor.submit(run)
+
+    @property
+    def saturated(self) -> bool:
+        return self.busy >= self.max_workers
+
+
+# 호출 지점별 풀 (한 번에 쓰는 호출 수의 몇 배로 잡아서 멈춘 호출이 있어도 여유를 둠)
+FANOUT_POOLS = {
+    "refresh": FanoutPool("refresh", max_workers=6),   # 사전 빌드 3건
+    "changes": FanoutPool("changes", max_workers=8),   # /menus/changes 2건
+    "stats": FanoutPool("stats", max_workers=16),      # /stats 4건
+}
+
+
+def run_parallel(calls: dict[str, Callable[[], Any]], pool: str, timeout: float = FANOUT_TIMEOUT) -> tuple[dict[str, Any], dict[str, str]]:
+    """
+    서로 독립적인 백엔드 호출들을 동시에 실행
+
+    지연 시간 = 가장 느린 호출 1건 (순차 실행 시에는 합계)
+    deadline 안에 끝나지 않거나 실패한 호출은 결과 대신 에러로 반환 (부분 결과 허용)
+
+    시간 초과한 호출은 취소되지 않고 워커를 계속 점유한다 (FanoutPool 참고).
+    워커가 모두 멈춘 호출에 묶여 시작조차 못 한 호출은 'queued'로 구분해서 반환하고 포화 로그를 남긴다.
+
+    Args:
+        pool: FANOUT_POOLS 키 (호출 지점)
+
+    Returns: (results, errors)
+        - results: {이름: 반환값} (성공한 호출만)
+        - errors: {이름: 에러 메시지} (실패/시간 초과한 호출만)
+    """
+    fanout = FANOUT_POOLS[pool]
+    futures = {name: fanout.submit(fn) for name, fn in calls.items()}
+    _, pending = wait(futures.values(), timeout=timeout)
+
+    results: dict[str, Any] = {}
+    errors: dict[str, str] = {}
+    for name, future in futures.items():
+        if future in pending:
+            # 아직 대기열에 있는 호출만 실제로 취소됨
+            if future.cancel():
+                errors[name] = f"queued ({timeout}s, pool saturated)"
+            else:
+                errors[name] = f"timeout ({timeout}s)"
+        elif future.exception() is not None:
+            errors[name] = str(future.exception())
+        else:
+            results[name] = future.result()
+
+    if pending and fanout.saturated:
+        print(f"⚠️  fan-out 풀 포화 ({fanout.name}): 실행 중 {fanout.busy}/{fanout.max_workers}")
+    return results, errors
+
+
+# ============================================
+# 실시간 식단 변경 알림 (SSE 브로드캐스터)
+# ============================================
+
+class MenuBroadcaster:
+    """
+    모든 SSE 연결이 공유하는 이벤트 브로드캐스터
+
+    - 최근 이벤트를 링 버퍼(deque)에 보관하고, 각 연결은 마지막으로 받은 이벤트 ID만 들고 있음
+      → 연결당 큐가 없어 연결 수가 늘어도 메모리는 거의 늘지 않음
+    - publish()는 스레드풀(동기 핸들러)에서도 호출 가능, 대기 중인 연결은 이벤트 루프에서 깨움
+    - Last-Event-ID가 버퍼 범위 안이면 놓친 이벤트를 재전송, 벗어나면 resync 이벤트 전송
+    """
+
+    def __init__(self, history: int = 100):
+        self._lock = threading.Lock()
+        self._events: deque[tuple[int, str, str]] = deque(maxlen=history)
+        self.last_id = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def publish(self, event: str, data: dict) -> int:
+        """이벤트 추가 후 대기 중인 연결들을 깨움"""
+        with self._lock:
+            self.last_id += 1
+            event_id = self.last_id
+            self._events.append((event_id, event, json.dumps(data, ensure_ascii=False)))
+            loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._notify)
+        return event_id
+
+    def _notify(self):
+        """(이벤트 루프 안에서) 현재 대기자 전원을 깨우고 새 Event로 교체"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    def can_resume(self, last_event_id: int) -> bool:
+        """Last-Event-ID 이후 이벤트를 빠짐없이 재전송할 수 있는지"""
+        with self._lock:
+            if last_event_id > self.last_id:
+                return False  # 서버 재시작 등으로 ID가 초기화됨
+            oldest = self._events[0][0] if self._events else self.last_id + 1
+            return last_event_id >= oldest - 1
+
+    def events_after(self, last_event_id: int) -> list[tuple[int, str, str]]:
+        with self._lock:
+            return [item for item in self._events if item[0] > last_event_id]
+
+    async def wait(self, last_event_id: int, timeout: float) -> bool:
+        """last_event_id 이후 이벤트가 생길 때까지 대기 (timeout 시 False)"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        wakeup = self._wakeup
+        if self.last_id > last_event_id:
+            return True
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+broadcaster = MenuBroadcaster()
+
+
+def format_sse(event_id: int, event: str, data: str) -> str:
+    """SSE 메시지 포맷"""
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+# ============================================
+# 식단 조회 + 사전 빌드 페이로드 (prewarm)
+# ============================================
+
+def fetch_menus_by_date(target_date: str) -> list[dict]:
+    """특정 날짜의 메뉴 조회 (동시 요청은 한 번의 호출로 병합)"""
+    response = coalescer.do(
+        ("menus/date", target_date),
+        lambda: supabase.table("menus").select("*").eq("post_date", target_date).execute()
+    )
+    return response.data
+
+
+def fetch_menus_by_week(week_start: str) -> list[dict]:
+    """특정 주의 메뉴 조회 (동시 요청은 한 번의 호출로 병합)"""
+    response = coalescer.do(
+        ("menus/week", week_start),
+        lambda: supabase.table("menus").select("*").eq("week_start", week_start).order("day_of_week").execute()
+    )
+    return response.data
+
+
+def build_date_payload(target_date: str) -> Optional[dict]:
+    """날짜별 응답 본문 생성 (데이터 없으면 None)"""
+    menus = fetch_menus_by_date(target_date)
+    if not menus:
+        return None
+    return {
+        "date": target_date,
+        "count": len(menus),
+        "menus": menus
+    }
+
+
+def build_week_payload(week_start: str) -> Optional[dict]:
+    """주간 응답 본문 생성 (데이터 없으면 None)"""
+    menus = fetch_menus_by_week(week_start)
+    if not menus:
+        return None
+    return {
+        "week_start": week_start,
+        "count": len(menus),
+        "menus": menus
+    }
+
+
+class PrebuiltPayloads:
+    """
+    /internal/refresh 호출 시 미리 만들어 두는 응답 본문 저장소
+
+    키: ("date", "YYYY-MM-DD") 또는 ("week", "YYYY-MM-DD")
+    refresh 때 통째로 교체하고, 빌드 후 max_age초가 지나면 사용하지 않는다.
+    (refresh 호출이 실패했거나 다른 워커가 받은 경우에도 오래된 식단을 계속 내보내지 않도록
+     만료 후에는 요청 시 직접 조회)
+    """
+
+    def __init__(self, max_age: float = PREBUILT_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._payloads: dict[tuple[str, str], dict] = {}
+        self._built_at: Optional[float] = None
+        # 지금까지 사전 빌드에서 본 post_no (None이면 아직 기준 데이터 없음)
+        self._known_post_nos: Optional[set[str]] = None
+        self.refreshed_at: Optional[datetime] = None
+
+    def get(self, kind: str, key: str) -> Optional[dict]:
+        """사전 빌드된 응답 (없거나 max_age가 지났으면 None)"""
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at > self.max_age:
+                return None
+            return self._payloads.get((kind, key))
+
+    def replace(self, payloads: dict[tuple[str, str], dict], complete: bool = True) -> tuple[dict[tuple[str, str], dict], Optional[set[str]]]:
+        """
+        통째로 교체하고 (이전 페이로드, 이전까지 본 post_no)를 반환
+
+        Args:
+            payloads: 조회에 성공한 키의 페이로드만
+            complete: 모든 키 조회에 성공했는지. 기준 데이터가 아직 없을 때 일부라도 실패하면
+                      기준을 잡지 않음 (실패한 키의 기존 게시물이 다음 refresh에서 new_post로 보이지 않도록)
+        """
+        post_nos = {menu["post_no"] for payload in payloads.values() for menu in payload["menus"]}
+        with self._lock:
+            previous, known = self._payloads, self._known_post_nos
+            self._payloads = payloads
+            self._built_at = time.monotonic()
+            if known is not None:
+                self._known_post_nos = known | post_nos
+            elif complete:
+                self._known_post_nos = post_nos
+            self.refreshed_at = datetime.now()
+        return previous, known
+
+
+    @property
+    def has_baseline(self) -> bool:
+        """변경 이벤트 비교 기준(post_no 목록)이 잡혀 있는지"""
+        return self._known_post_nos is not None
+
+
+prebuilt = PrebuiltPayloads()
+
+
+def current_week_start(today: date) -> date:
+    """오늘이 속한 주의 월요일 (crawl/utils.get_week_range와 동일 기준)"""
+    return today - timedelta(days=today.weekday())
+
+
+def refresh_prebuilt_payloads(publish: bool = True) -> dict[tuple[str, str], dict]:
+    """
+    오늘 / 이번 주 / 다음 주 응답 본문을 새로 조회해서 교체
+
+    Args:
+        publish: 변경 사항을 SSE 이벤트로 발행할지 (서버 시작 시 기준 데이터 적재는 False)
+    """
+    today = datetime.now().date()
+    this_week = current_week_start(today)
+    next_week = this_week + timedelta(days=7)
+
+    targets = {
+        ("date", str(today)): build_date_payload,
+        ("week", str(this_week)): build_week_payload,
+        ("week", str(next_week)): build_week_payload,
+    }
+    results, errors = run_parallel({
+        key: (lambda builder=builder, value=key[1]: builder(value))
+        for key, builder in targets.items()
+    }, pool="refresh")
+    if errors:
+        # 실패한 항목은 사전 빌드 없이 요청 시 직접 조회하도록 제외
+        print(f"⚠️  사전 빌드 일부 실패: {errors}")
+
+    payloads = {key: payload for key, payload in results.items() if payload is not None}
+    previous, known_post_nos = prebuilt.replace(payloads, complete=not errors)
+    if publish:
+        publish_menu_changes(previous, payloads, known_post_nos)
+    return payloads
+
+
+def _menus_by_post(payload: Optional[dict]) -> dict[str, list[dict]]:
+    """페이로드의 메뉴를 post_no별로 묶음"""
+    grouped: dict[str, list[dict]] = {}
+    for menu in (payload or {}).get("menus", []):
+        grouped.setdefault(menu["post_no"], []).append(menu)
+    return grouped
+
+
+def publish_menu_changes(
+    previous: dict[tuple[str, str], dict],
+    current: dict[tuple[str, str], dict],
+    known_post_nos: Optional[set[str]]
+):
+    """
+    refresh 전후 페이로드를 비교해 게시물(post_no)당 이벤트 1건씩 발행
+
+    - new_post: 이전 refresh까지 한 번도 본 적 없는 post_no가 생김
+    - menu_updated: 이미 알던 게시물의 메뉴 내용이 수정됨 (이전에도 있던 키끼리만 비교)
+
+    서버 재시작 직후나 날짜가 바뀌어 새로 생긴 키는 알던 게시물이면 이벤트를 보내지 않고,
+    기준 데이터가 없으면(known_post_nos is None) 아무것도 발행하지 않는다.
+    같은 게시물이 date / week 페이로드에 함께 있어도 keys에 묶어서 1번만 발행한다.
+    """
+    if known_post_nos is None:
+        return
+
+    changes: dict[str, dict] = {}
+    for (kind, key), payload in current.items():
+        old_by_post = _menus_by_post(previous.get((kind, key)))
+        for post_no, menus in _menus_by_post(payload).items():
+            if post_no not in known_post_nos:
+                event = "new_post"
+            elif (kind, key) in previous and old_by_post.get(post_no) != menus:
+                event = "menu_updated"
+            else:
+                continue
+            change = changes.setdefault(post_no, {"event": event, "keys": []})
+            change["keys"].append(f"{kind}/{key}")
+
+    for post_no, change in sorted(changes.items()):
+        broadcaster.publish(change["event"], {"post_no": post_no, "keys": change["keys"]})
+
+
+def verify_internal_token(x_internal_token: Optional[str], authorization: Optional[str]):
+    """내부 엔드포인트 인증 (X-Internal-Token 또는 Authorization: Bearer)"""
+    if not INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=503, detail="INTERNAL_API_TOKEN이 설정되지 않아 내부 API가 비활성화되어 있습니다.")
+
+    token = x_internal_token
+    if token is None and authorization and authorization.startswith("Bearer "):
+        token = authorization[len("Bearer "):]
+
+    if not token or not hmac.compare_digest(token, INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=401, detail="인증 실패")
+
+
+# ============================================
+# 클라이언트별 요청 제한 (token bucket)
+# ============================================
+
+class TokenBucket:
+    """클라이언트 1명 × 경로 그룹 1개당 버킷 (남은 토큰, 마지막 갱신 시각)"""
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """
+    인메모리 token bucket 요청 제한기
+
+    - 경로 그룹별 예산: (버킷 크기, 초당 충전량)
+    - 버킷은 OrderedDict에 최근 사용 순으로 유지하고, 요청 처리 시
+      idle_ttl 동안 사용되지 않은 앞쪽 버킷부터 제거 (상각 O(1))
+    - 이벤트 루프(미들웨어) 안에서만 호출되므로 별도 락 없음
+    """
+
+    def __init__(self, budgets: dict[str, tuple[float, float]], idle_ttl: float = 600, max_buckets: int = 50_000):
+        self.budgets = budgets
+        self.idle_ttl = idle_ttl
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict[tuple[str, str], TokenBucket] = OrderedDict()
+
+    def _evict(self, now: float):
+        """오래 사용되지 않은 버킷 제거 (가장 오래된 것부터)"""
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if now - bucket.updated < self.idle_ttl and len(self._buckets) <= self.max_buckets:
+                break
+            del self._buckets[key]
+
+    def acquire(self, client_key: str, group: str, scale: float = 1.0) -> float:
+        """
+        토큰 1개 사용 시도
+
+        Args:
+            scale: 예산 배수 (여러 클라이언트가 공유하는 버킷용)
+
+        Returns: 0이면 허용, 양수면 다음 토큰까지 기다려야 하는 초 (Retry-After)
+        """
+        capacity, refill_rate = self.budgets[group]
+        capacity, refill_rate = capacity * scale, refill_rate * scale
+        now = time.monotonic()
+        self._evict(now)
+
+        key = (client_key, group)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(capacity, now)
+            self._buckets[key] = bucket
+        else:
+            bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated) * refill_rate)
+            bucket.updated = now
+            self._buckets.move_to_end(key)
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / refill_rate
+
+    def refund(self, client_key: str, group: str, scale: float = 1.0):
+        """acquire로 사용한 토큰 1개 반환 (다른 버킷에서 거절된 요청용)"""
+        bucket = self._buckets.get((client_key, group))
+        if bucket is not None:
+            bucket.tokens = min(self.budgets[group][0] * scale, bucket.tokens + 1)
+
+
+# 경로 그룹별 예산: (버킷 크기, 초당 충전량)
+RATE_LIMIT_BUDGETS = {
+    "menus_list": (10, 0.2),     # /menus (limit 최대 500, 가장 무거움)
+    "stats": (10, 0.2),          # /stats
+    "menus": (60, 1.0),          # /menus/today, /menus/date/*, /menus/week/*
+    "stream": (5, 0.1),          # /menus/stream (연결/재연결 횟수)
+    "default": (60, 1.0),
+}
+
+# IP 공유 버킷 예산 배수 (0이면 IP 공유 버킷 사용 안 함)
+# 캠퍼스 Wi-Fi NAT 뒤에서는 점심시간에 수백 명이 IP 하나를 공유하므로 넉넉하게 잡는다.
+RATE_LIMIT_SHARED_IP_SCALE = float(os.getenv("RATE_LIMIT_SHARED_IP_SCALE", "100"))
+
+# 리버스 프록시 주소 (쉼표 구분): 이 주소에서 온 요청은 X-Forwarded-For에서 클라이언트 IP를 읽음
+TRUSTED_PROXIES = {ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "").split(",") if ip.strip()}
+
+# 요청 제한 제외 경로 (/internal/*는 토큰 인증으로 보호)
+RATE_LIMIT_EXEMPT_PREFIXES = ("/internal/", "/docs", "/openapi.json")
+
+rate_limiter = RateLimiter(RATE_LIMIT_BUDGETS)
+
+
+def rate_limit_group(path: str) -> str:
+    """요청 경로 → 예산 그룹"""
+    if path == "/menus":
+        return "menus_list"
+    if path == "/stats":
+        return "stats"
+    if path == "/menus/stream":
+        return "stream"
+    if path.startswith("/menus/"):
+        return "menus"
+    return "default"
+
+
+def client_ip(request: Request) -> str:
+    """
+    요청한 클라이언트 IP
+
+    직접 연결한 주소가 TRUSTED_PROXIES에 있으면 X-Forwarded-For를 오른쪽부터 읽어
+    신뢰하는 프록시가 아닌 첫 주소를 사용 (클라이언트가 앞쪽에 임의로 넣은 값은 무시됨)
+    """
+    ip = request.client.host if request.client else "unknown"
+    if ip not in TRUSTED_PROXIES:
+        return ip
+    forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+    for hop in reversed(forwarded):
+        if hop not in TRUSTED_PROXIES:
+            return hop
+    return ip
+
+
+def rate_limit_client_keys(request: Request) -> tuple[str, str]:
+    """
+    버킷 식별자 (IP 공유 버킷, 클라이언트 버킷)
+
+    앱 인스턴스 ID 헤더는 클라이언트가 임의로 바꿀 수 있으므로 IP 안에서만 구분에 사용한다.
+    헤더를 매번 바꿔 보내도 IP 공유 버킷(예산 × RATE_LIMIT_SHARED_IP_SCALE)에 걸린다.
+    """
+    ip = client_ip(request)
+    instance_id = request.headers.get("x-app-instance-id")
+    if instance_id and len(instance_id) <= 64:
+        return f"ip:{ip}", f"app:{ip}:{instance_id}"
+    return f"ip:{ip}", f"ip-client:{ip}"
+
+
+@app.middleware("http")
+async def rate_limit(request: Request, call_next):
+    """클라이언트별 요청 제한 (초과 시 429 + Retry-After)"""
+    path = request.url.path
+    if not RATE_LIMIT_ENABLED or request.method == "OPTIONS" or path.startswith(RATE_LIMIT_EXEMPT_PREFIXES):
+        return await call_next(request)
+
+    group = rate_limit_group(path)
+    shared_key, client_key = rate_limit_client_keys(request)
+    # IP 공유 버킷을 먼저 확인해서, 거절된 요청으로는 클라이언트 버킷을 새로 만들지 않음
+    shared = RATE_LIMIT_SHARED_IP_SCALE > 0
+    retry_after = rate_limiter.acquire(shared_key, group, scale=RATE_LIMIT_SHARED_IP_SCALE) if shared else 0.0
+    if retry_after == 0:
+        retry_after = rate_limiter.acquire(client_key, group)
+        if retry_after > 0 and shared:
+            rate_limiter.refund(shared_key, group, scale=RATE_LIMIT_SHARED_IP_SCALE)
+    if retry_after > 0:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "요청이 너무 많습니다. 잠시 후 다시 시도하세요."},
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+    return await call_next(request)
+
+
 # ============================================
 # API 엔드포인트
 # ============================================
@@ -72,8 +661,10 @@ def root():
         "endpoints": {
             "전체 식단": "/menus",
             "날짜별 조회": "/menus/date/{date}",
+            "증분 동기화": "/menus/changes?since={cursor}",
             "식당별 조회": "/menus/cafeteria/{cafeteria}",
             "오늘 식단": "/menus/today",
+            "실시간 변경 알림 (SSE)": "/menus/stream",
             "통계": "/stats"
         }
     }
@@ -85,17 +676,13 @@ def get_today_menus():
     try:
         today = datetime.now().date()
         
-        # Supabase에서 오늘 날짜의 메뉴 조회
-        response = supabase.table("menus").select("*").eq("post_date", str(today)).execute()
+        # 사전 빌드된 응답이 있으면 바로 반환, 없으면 Supabase 조회
+        payload = prebuilt.get("date", str(today)) or build_date_payload(str(today))
         
-        if not response.data:
+        if payload is None:
             raise HTTPException(status_code=404, detail=f"오늘({today}) 식단이 없습니다.")
         
-        return {
-            "date": str(today),
-            "count": len(response.data),
-            "menus": response.data
-        }
+        return payload
     except HTTPException:
         raise
     except Exception as e:
@@ -104,11 +691,54 @@ def get_today_menus():
         raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
 
 
+@app.get("/menus/stream")
+async def stream_menus(request: Request, last_event_id: Optional[str] = Header(default=None)):
+    """
+    식단 변경 실시간 스트림 (Server-Sent Events)
+
+    이벤트: new_post, menu_updated, resync (놓친 이벤트를 복구할 수 없음 → 전체 재조회 필요)
+    데이터: {"post_no": "219", "keys": ["date/2026-01-12", "week/2026-01-12"]} (게시물당 1건)
+    재연결 시 Last-Event-ID 헤더로 이어받기
+    """
+    try:
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume_from = None
+
+    async def event_stream():
+        yield "retry: 5000\n\n"
+
+        if resume_from is None:
+            cursor = broadcaster.last_id
+        elif broadcaster.can_resume(resume_from):
+            cursor = resume_from
+        else:
+            cursor = broadcaster.last_id
+            yield format_sse(cursor, "resync", json.dumps({"reason": "history_unavailable"}))
+
+        while not await request.is_disconnected():
+            events = broadcaster.events_after(cursor)
+            for event_id, event, data in events:
+                yield format_sse(event_id, event, data)
+                cursor = event_id
+            if not events and not await broadcaster.wait(cursor, timeout=15):
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/menus")
 def get_all_menus(limit: int = Query(default=100, ge=1, le=500)):
     """전체 메뉴 조회 (최신순)"""
     try:
-        response = supabase.table("menus").select("*").order("post_date", desc=True).limit(limit).execute()
+        response = coalescer.do(
+            ("menus", limit),
+            lambda: supabase.table("menus").select("*").order("post_date", desc=True).limit(limit).execute()
+        )
         
         return {
             "count": len(response.data),
@@ -119,6 +749,54 @@ def get_all_menus(limit: int = Query(default=100, ge=1, le=500)):
         raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
 
 
+@app.get("/menus/changes")
+def get_menu_changes(
+    since: int = Query(default=0, ge=0),
+    limit: int = Query(default=500, ge=1, le=1000)
+):
+    """
+    증분 동기화: cursor(since) 이후 추가/수정된 메뉴와 삭제된 메뉴(tombstone) 조회
+
+    응답의 cursor를 다음 요청의 since로 사용 (has_more가 true면 바로 이어서 요청)
+    """
+    try:
+        results, errors = run_parallel({
+            "changed": lambda: coalescer.do(
+                ("menus/changes", since, limit),
+                lambda: supabase.table("menus").select("*").gt("change_seq", since).order("change_seq").limit(limit).execute()
+            ),
+            "removed": lambda: coalescer.do(
+                ("menus/tombstones", since, limit),
+                lambda: supabase.table("menu_tombstones").select("menu_id, post_no, cafeteria, day_of_week, change_seq")
+                .gt("change_seq", since).order("change_seq").limit(limit).execute()
+            ),
+        }, pool="changes")
+        # 변경분은 일부만 반환하면 cursor가 틀어지므로 부분 결과를 허용하지 않음
+        if errors:
+            raise RuntimeError(", ".join(f"{name}: {error}" for name, error in errors.items()))
+        changed = results["changed"].data
+        removed = results["removed"].data
+
+        # 두 테이블의 change_seq는 하나의 순서를 공유하므로 합쳐서 limit개까지만 반환
+        merged = sorted(
+            [("upsert", row) for row in changed] + [("delete", row) for row in removed],
+            key=lambda item: item[1]["change_seq"]
+        )
+        page = merged[:limit]
+        cursor = page[-1][1]["change_seq"] if page else since
+
+        return {
+            "since": since,
+            "cursor": cursor,
+            "has_more": len(merged) > limit or len(changed) == limit or len(removed) == limit,
+            "menus": [row for op, row in page if op == "upsert"],
+            "deleted": [row for op, row in page if op == "delete"]
+        }
+    except Exception as e:
+        print(f"❌ 변경분 조회 실패: {e}")
+        raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
+
+
 @app.get("/menus/date/{target_date}")
 def get_menus_by_date(target_date: str):
     """특정 날짜의 식단 조회 (YYYY-MM-DD 형식)"""
@@ -126,16 +804,12 @@ def get_menus_by_date(target_date: str):
         # 날짜 형식 검증
         datetime.strptime(target_date, "%Y-%m-%d")
         
-        response = supabase.table("menus").select("*").eq("post_date", target_date).execute()
+        payload = prebuilt.get("date", target_date) or build_date_payload(target_date)
         
-        if not response.data:
+        if payload is None:
             raise HTTPException(status_code=404, detail=f"{target_date} 식단이 없습니다.")
         
-        return {
-            "date": target_date,
-            "count": len(response.data),
-            "menus": response.data
-        }
+        return payload
     except ValueError:
         raise HTTPException(status_code=400, detail="날짜 형식이 잘못되었습니다. YYYY-MM-DD 형식으로 입력하세요.")
     except HTTPException:
@@ -152,16 +826,12 @@ def get_menus_by_week(week_start: str):
         # 날짜 형식 검증
         datetime.strptime(week_start, "%Y-%m-%d")
         
-        response = supabase.table("menus").select("*").eq("week_start", week_start).order("day_of_week").execute()
+        payload = prebuilt.get("week", week_start) or build_week_payload(week_start)
         
-        if not response.data:
+        if payload is None:
             raise HTTPException(status_code=404, detail=f"{week_start} 주의 식단이 없습니다.")
         
-        return {
-            "week_start": week_start,
-            "count": len(response.data),
-            "menus": response.data
-        }
+        return payload
     except ValueError:
         raise HTTPException(status_code=400, detail="날짜 형식이 잘못되었습니다. YYYY-MM-DD 형식으로 입력하세요.")
     except HTTPException:
@@ -175,20 +845,77 @@ def get_menus_by_week(week_start: str):
 def get_stats():
     """통계 정보 조회"""
     try:
-        # 전체 메뉴 개수
-        menus_response = supabase.table("menus").select("id", count="exact").execute()
+        results, errors = run_parallel({
+            # 전체 메뉴 개수
+            "menus": lambda: coalescer.do(
+                ("stats/menus",),
+                lambda: supabase.table("menus").select("id", count="exact").execute()
+            ),
+            # 크롤링 상태
+            "state": lambda: coalescer.do(
+                ("stats/state",),
+                lambda: supabase.table("crawl_state").select("*").eq("id", 1).execute()
+            ),
+            # 최근 크롤링 로그
+            "logs": lambda: coalescer.do(
+                ("stats/logs",),
+                lambda: supabase.table("crawl_logs").select("*").order("crawled_at", desc=True).limit(5).execute()
+            ),
+        }, pool="stats")
         
-        # 크롤링 상태
-        state_response = supabase.table("crawl_state").select("*").eq("id", 1).execute()
+        if not results:
+            raise RuntimeError(", ".join(f"{name}: {error}" for name, error in errors.items()))
         
-        # 최근 크롤링 로그
-        logs_response = supabase.table("crawl_logs").select("*").order("crawled_at", desc=True).limit(5).execute()
+        # 일부 쿼리만 실패한 경우 해당 항목은 null로 두고 errors에 사유 표시
+        menus_response = results.get("menus")
+        state_response = results.get("state")
+        logs_response = results.get("logs")
         
-        return {
-            "total_menus": menus_response.count if menus_response.count else 0,
-            "crawl_state": state_response.data[0] if state_response.data else None,
-            "recent_logs": logs_response.data
+        stats = {
+            "total_menus": (menus_response.count or 0) if menus_response else None,
+            "crawl_state": (state_response.data[0] if state_response.data else None) if state_response else None,
+            "recent_logs": logs_response.data if logs_response else None
         }
+        if errors:
+            print(f"⚠️  통계 일부 조회 실패: {errors}")
+            stats["errors"] = errors
+        return stats
     except Exception as e:
         print(f"❌ 통계 조회 실패: {e}")
         raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
+
+
+# ============================================
+# 내부 API (크롤러 전용)
+# ============================================
+
+
+@app.on_event("startup")
+def load_prebuilt_payloads():
+    """서버 시작 시 사전 빌드 페이로드를 이벤트 발행 없이 적재 (이후 refresh의 비교 기준)"""
+    # 조회가 하나라도 실패하면 기준 데이터 없이 시작 → 모두 성공하는 첫 refresh가 이벤트 없이 기준만 잡음
+    try:
+        payloads = refresh_prebuilt_payloads(publish=False)
+        print(f"✅ 사전 빌드 페이로드 적재: {len(payloads)}개 (기준 데이터 {'있음' if prebuilt.has_baseline else '없음'})")
+    except Exception as e:
+        print(f"⚠️  사전 빌드 기준 데이터 적재 실패: {e}")
+
+
+@app.post("/internal/refresh")
+def refresh_menus(
+    x_internal_token: Optional[str] = Header(default=None),
+    authorization: Optional[str] = Header(default=None)
+):
+    """크롤러 업로드 직후 호출: 오늘/이번 주/다음 주 응답을 다시 조회해 메모리에 미리 빌드"""
+    verify_internal_token(x_internal_token, authorization)
+    try:
+        payloads = refresh_prebuilt_payloads()
+        print(f"🔄 사전 빌드 갱신 완료: {len(payloads)}개")
+        return {
+            "refreshed_at": prebuilt.refreshed_at.isoformat(),
+            "payloads": {f"{kind}/{key}": payload["count"] for (kind, key), payload in payloads.items()}
+        }
+    except Exception as e:
+        print(f"❌ 사전 빌드 갱신 실패: {e}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")